@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+# Vectorized SSM-AI batch engine (NumPy): same math as ssm_ai_quickstart.rsi_from_items, one RSI per candidate
+# Items live in contiguous arrays e_in, e_out, w; candidates are ragged groups given by offsets or ids
+#   offsets: candidate k owns items offsets[k] .. offsets[k+1]-1  (len = n_cand + 1, offsets[0] = 0)
+#   ids:     ids[i] = candidate of item i (any order)
+# Order-invariant U/W rule, segment-summed: U[k] = SUM w*atanh(a_in), V[k] = SUM w*atanh(a_out), W[k] = SUM w
+
+from math import fsum
+from typing import Dict, Hashable, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ssm_ai_quickstart import BANDS, EPS_A, EPS_W, RapidityBands, apply_gate, rapidity_max
+
+BATCH_SUMMATION_MODES = ("naive", "pairwise", "exact")
+
+# ---------- dtype ----------
+# Item lanes (e_in, e_out, w, u, w*u) and per-candidate keys run in `dtype`; float32 halves the bytes
+# moved by the memory-bound elementwise passes. Segment accumulators stay float64 (bincount / fsum;
+# "pairwise" sums in dtype), so U_in/V_out/W come back float64 either way.
+DTYPES = ("float64", "float32")
+EPS_FLOORS = {"float64": (0.0, 0.0), "float32": (1e-8, 2.0 ** -23)}   # (eps_w, eps_a) floors (CALIBRATION)
+
+def eps_for(dtype: str, eps_w: float = EPS_W, eps_a: float = EPS_A) -> Tuple[float, float]:
+    # (eps_w, eps_a) raised to the dtype's floors: eps_w >= 1e-8 under float32 (manifest), eps_a >= float32
+    # epsilon so 1 - eps_a stays below 1.0 and the clamp still bites
+    if dtype not in EPS_FLOORS:
+        raise ValueError(f"dtype must be one of {DTYPES}, got {dtype!r}")
+    floor_w, floor_a = EPS_FLOORS[dtype]
+    return max(eps_w, floor_w), max(eps_a, floor_a)
+
+# ---------- packing ----------
+def pack_groups(groups: Sequence[Sequence[Tuple[float, float, float]]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    # [[(e_in, e_out, w), ...], ...] -> e_in, e_out, w, offsets  (convenience for rsi_from_items-style inputs)
+    sizes = np.fromiter((len(g) for g in groups), dtype=np.int64, count=len(groups))
+    offsets = np.zeros(len(groups) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=offsets[1:])
+    flat = np.array([it for g in groups for it in g], dtype=np.float64).reshape(-1, 3)
+    return flat[:, 0].copy(), flat[:, 1].copy(), flat[:, 2].copy(), offsets
+
+def segment_ids(n_items: int, offsets: Optional[np.ndarray] = None, ids: Optional[np.ndarray] = None,
+                n_cand: Optional[int] = None) -> Tuple[np.ndarray, int]:
+    # Normalize offsets/ids to (ids, n_cand); exactly one of offsets/ids must be given
+    if (offsets is None) == (ids is None):
+        raise ValueError("give exactly one of offsets or ids")
+    if offsets is not None:
+        offsets = np.asarray(offsets, dtype=np.int64)
+        if offsets.ndim != 1 or len(offsets) < 1 or offsets[0] != 0 or offsets[-1] != n_items:
+            raise ValueError(f"offsets must start at 0 and end at n_items={n_items}")
+        sizes = np.diff(offsets)
+        if (sizes < 0).any():
+            raise ValueError("offsets must be non-decreasing")
+        k = len(offsets) - 1
+        return np.repeat(np.arange(k, dtype=np.int64), sizes), k
+    ids = np.asarray(ids, dtype=np.int64)
+    if ids.shape != (n_items,):
+        raise ValueError(f"ids must have shape ({n_items},), got {ids.shape}")
+    if n_items and ids.min() < 0:
+        raise ValueError("ids must be >= 0")
+    k = int(ids.max()) + 1 if n_items else 0
+    if n_cand is not None:
+        if n_cand < k:
+            raise ValueError(f"n_cand={n_cand} smaller than max(ids)+1={k}")
+        k = n_cand
+    return ids, k
+
+# ---------- lens -> rapidity (vectorized) ----------
+def alignment_batch(e_in: np.ndarray, e_out: np.ndarray, c: float = 1.0, eps_a: float = EPS_A,
+                    dtype: str = "float64") -> Tuple[np.ndarray, np.ndarray]:
+    # a_in := clamp(tanh(-c*e_in)), a_out := clamp(tanh(+c*e_out)); arrays in, arrays out
+    eps_a = eps_for(dtype, eps_a=eps_a)[1]
+    lo, hi = np.array([-1.0 + eps_a, 1.0 - eps_a], dtype=dtype)
+    a_in = np.clip(np.tanh(np.asarray(e_in, dtype=dtype) * np.array(-c, dtype=dtype)), lo, hi)
+    a_out = np.clip(np.tanh(np.asarray(e_out, dtype=dtype) * np.array(c, dtype=dtype)), lo, hi)
+    return a_in, a_out
+
+def rapidity_batch(e_in: np.ndarray, e_out: np.ndarray, c: float = 1.0, eps_a: float = EPS_A,
+                   dtype: str = "float64") -> Tuple[np.ndarray, np.ndarray]:
+    # u := clip(+-c*e, -u_max, u_max); the tanh->atanh-free fast path of ssm_ai_quickstart.map_to_rapidity
+    u_max = np.array(rapidity_max(eps_for(dtype, eps_a=eps_a)[1]), dtype=dtype)
+    u_in = np.clip(np.asarray(e_in, dtype=dtype) * np.array(-c, dtype=dtype), -u_max, u_max)
+    u_out = np.clip(np.asarray(e_out, dtype=dtype) * np.array(c, dtype=dtype), -u_max, u_max)
+    return u_in, u_out
+
+# ---------- segment sums ----------
+def segment_sum(vals: np.ndarray, seg: np.ndarray, k: int, summation: str = "naive") -> np.ndarray:
+    # Sum each row of vals (m, n) per segment -> (m, k)
+    #   naive:    bincount, sequential in item order
+    #   pairwise: fixed binary tree over each segment's items (in item order); error O(log n) ulp
+    #   exact:    math.fsum per segment; correctly rounded, so bit-identical for any order/sharding
+    #             and equal to UWAccumulator(summation="exact")
+    # float32 vals: naive/exact accumulate in float64, pairwise adds in float32; the result is float64
+    vals = np.atleast_2d(np.asarray(vals))
+    if vals.dtype != np.float32:
+        vals = vals.astype(np.float64, copy=False)
+    if summation == "naive":
+        return np.stack([np.bincount(seg, weights=v, minlength=k) for v in vals])
+    if summation not in BATCH_SUMMATION_MODES:
+        raise ValueError(f"summation must be one of {BATCH_SUMMATION_MODES}, got {summation!r}")
+    order = np.argsort(seg, kind="stable")
+    sizes = np.bincount(seg, minlength=k)
+    starts = np.zeros(k + 1, dtype=np.int64)
+    np.cumsum(sizes, out=starts[1:])
+    v = vals[:, order]
+    out = np.zeros((len(vals), k))
+    if summation == "exact":
+        bounds = starts.tolist()
+        for row, vr in zip(out, v.tolist()):
+            row[:] = [fsum(vr[lo:hi]) for lo, hi in zip(bounds[:-1], bounds[1:])]
+        return out
+    s_sorted = seg[order]
+    r = np.arange(len(order)) - starts[s_sorted]          # rank of each item inside its segment
+    size_of = sizes[s_sorted]
+    step = 1
+    while step < (sizes.max() if k else 0):
+        idx = np.flatnonzero((r % (2 * step) == 0) & (r + step < size_of))
+        v[:, idx] += v[:, idx + step]
+        step *= 2
+    nz = np.flatnonzero(sizes)
+    out[:, nz] = v[:, starts[nz]]
+    return out
+
+def uvw_batch(e_in, e_out, w, offsets=None, ids=None, n_cand: Optional[int] = None,
+              c: float = 1.0, eps_a: float = EPS_A, summation: str = "naive",
+              dtype: str = "float64") -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Per-candidate partial sums (U_in, V_out, W); mergeable by plain addition across shards
+    w = np.asarray(w, dtype=dtype)
+    seg, k = segment_ids(len(w), offsets, ids, n_cand)
+    u_in, u_out = rapidity_batch(e_in, e_out, c, eps_a, dtype)
+    U_in, V_out, W = segment_sum(np.stack([w * u_in, w * u_out, w]), seg, k, summation)
+    return U_in, V_out, W
+
+def rsi_from_uvw(U_in: np.ndarray, V_out: np.ndarray, W: np.ndarray, eps_w: float = EPS_W,
+                 dtype: str = "float64") -> np.ndarray:
+    # RSI := tanh((V_out - U_in)/max(W, eps_w)); zero-evidence (W <= 0) -> 0
+    return np.tanh(rapidity_from_uvw(U_in, V_out, W, eps_w, dtype))
+
+def rapidity_from_uvw(U_in: np.ndarray, V_out: np.ndarray, W: np.ndarray, eps_w: float = EPS_W,
+                      dtype: str = "float64") -> np.ndarray:
+    # z := (V_out - U_in)/max(W, eps_w), 0 for zero evidence; RSI = tanh(z), see band_codes_u
+    W = np.asarray(W, dtype=dtype)
+    z = (np.asarray(V_out, dtype=dtype) - np.asarray(U_in, dtype=dtype)) / np.maximum(W, eps_for(dtype, eps_w)[0])
+    z[W <= 0] = 0.0
+    return z
+
+# ---------- order-invariant RSI chooser (batch) ----------
+def rsi_batch(e_in, e_out, w, offsets=None, ids=None, n_cand: Optional[int] = None,
+              c: float = 1.0, eps_w: float = EPS_W, eps_a: float = EPS_A, summation: str = "naive",
+              dtype: str = "float64") -> np.ndarray:
+    # One RSI per candidate; matches rsi_from_items per group up to the final np.tanh vs math.tanh rounding
+    # (float32: within ~1e-6, the replay tolerance for dtype="float32" rows)
+    U_in, V_out, W = uvw_batch(e_in, e_out, w, offsets, ids, n_cand, c, eps_a, summation, dtype)
+    return rsi_from_uvw(U_in, V_out, W, eps_w, dtype)
+
+# ---------- top-k chooser (u-space, batch) ----------
+def top_k_batch(U_in, V_out, W, k: int = 1, g_t: float = 1.0, mode: str = "mul",
+                eps_w: float = EPS_W, eps_a: float = EPS_A, dtype: str = "float64") -> Tuple[np.ndarray, np.ndarray]:
+    # Batch form of ssm_ai_quickstart.choose_top_k: (indices best first, RSI_env of those)
+    # argpartition on the u-space key, then ties at the k-th key resolved to the lowest indices
+    # (float32 keys: candidates closer than float32 rounding tie and go to the lower index)
+    eps_w, eps_a = eps_for(dtype, eps_w, eps_a)
+    u_max = np.array(rapidity_max(eps_a), dtype=dtype)
+    sgn = (g_t > 0) - (g_t < 0)
+    z = np.clip(rapidity_from_uvw(U_in, V_out, W, eps_w, dtype), -u_max, u_max)
+    key = sgn * z
+    n = len(key)
+    k = max(0, min(k, n))
+    if k == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+    kth = np.partition(key, n - k)[n - k]
+    above = np.flatnonzero(key > kth)
+    at = np.flatnonzero(key == kth)[: k - len(above)]
+    idx = np.concatenate([above, at])
+    idx = idx[np.lexsort((idx, -key[idx]))]
+    rsi = np.tanh(sgn * key[idx].astype(np.float64)) if sgn else np.zeros(k)
+    env = np.array([apply_gate(float(x), g_t, mode, eps_a) for x in rsi])
+    return idx, env
+
+# ---------- bands (vectorized) ----------
+def band_table(bands: Optional[Dict[str, float]] = None) -> Tuple[Tuple[str, ...], np.ndarray]:
+    # Manifest bands {label: lower edge} -> (labels low..high, thresholds); code i <-> labels[i]
+    # The lowest band's edge is the floor and is dropped; the default table gives
+    # labels ("A--", "A-", "A0", "A+", "A++") and thresholds (-0.90, -0.60, 0.60, 0.90)
+    ordered = sorted((BANDS if bands is None else bands).items(), key=lambda kv: kv[1])
+    if len(ordered) < 1:
+        raise ValueError("band table is empty")
+    labels = tuple(k for k, _ in ordered)
+    thresholds = np.array([t for _, t in ordered[1:]], dtype=np.float64)
+    if len(np.unique(thresholds)) != len(thresholds):
+        raise ValueError(f"band edges must be distinct: {dict(ordered)}")
+    return labels, thresholds
+
+def band_codes(x, thresholds: Optional[np.ndarray] = None) -> np.ndarray:
+    # RSI_env values -> uint8 band codes (0 = lowest band), same edges as band_of:
+    # an exact edge value goes to the band farther from zero (x >= +t moves up, x <= -t stays down);
+    # NaN passes no edge, so it lands in the lowest band like band_of(nan) (searchsorted sorts it last)
+    if thresholds is None:
+        thresholds = band_table()[1]
+    t = np.asarray(thresholds, dtype=np.float64)
+    x = np.asarray(x)
+    lower, upper = t[t < 0], t[t >= 0]
+    codes = np.searchsorted(lower, x, side="left") + np.searchsorted(upper, x, side="right")
+    return np.where(np.isnan(x), 0, codes).astype(np.uint8)
+
+def band_codes_u(z, rb: RapidityBands) -> np.ndarray:
+    # Band codes of apply_gate(tanh(z), rb.g_t, rb.mode) without tanh/gate: searchsorted on rb's z-space
+    # edge table; the few z inside rb's guard intervals (+-rb.margin around a threshold) go through
+    # rb.exact, so codes equal RapidityBands.code / band_of(apply_gate(math.tanh(z))) exactly
+    # (one compare pass per edge: with a handful of edges this beats searchsorted's per-element bisection)
+    z = np.asarray(z, dtype=np.float64)
+    zz = rb.sgn * z
+    codes = np.zeros(zz.shape, dtype=np.uint8)
+    for e in rb.edges:
+        codes += zz >= e
+    if rb.guard:
+        near = np.zeros(zz.shape, dtype=bool)
+        for lo, hi in zip(rb.guard[::2], rb.guard[1::2]):
+            near |= (zz >= lo) & (zz < hi)
+        idx = np.flatnonzero(near)
+        codes[idx] = [rb.exact(x) for x in z[idx].tolist()]
+    return codes
+
+def band_labels(codes: np.ndarray, labels: Optional[Sequence[str]] = None) -> np.ndarray:
+    # uint8 codes -> label strings, materialized only for output
+    return np.asarray(band_table()[0] if labels is None else labels)[codes]
+
+def band_histogram(x, bands: Optional[Dict[str, float]] = None, chunk: int = 1 << 22) -> Dict[str, int]:
+    # {label: count} over a large array, classified in chunks of `chunk` values
+    labels, thresholds = band_table(bands)
+    x = np.asarray(x)
+    counts = np.zeros(len(labels), dtype=np.int64)
+    for lo in range(0, len(x), chunk):
+        counts += np.bincount(band_codes(x[lo:lo + chunk], thresholds), minlength=len(labels))
+    return dict(zip(labels, counts.tolist()))
+
+# ---------- hysteresis band tracker ----------
+NO_BAND = 255   # code of an entity that has not been observed yet
+
+class BandTransitions(NamedTuple):
+    row: np.ndarray      # position in the update batch
+    entity: np.ndarray   # entity id
+    old: np.ndarray      # previous band code (NO_BAND on first sight)
+    new: np.ndarray      # band code after the update
+
+class BandTracker:
+    # Current band per entity (service, session, beam, ...) with hysteresis around every threshold:
+    #   promote only if x >= tau + h_up ; demote only if x <= tau - h_dn   (README / CALIBRATION)
+    # State is one uint8 code per entity id in a growable array; hashable keys map to dense ids.
+    # A batch may hold the same entity several times; its values apply in batch order.
+    __slots__ = ("labels", "thresholds", "h_up", "h_dn", "codes", "_ids")
+
+    def __init__(self, bands: Optional[Dict[str, float]] = None, h_up: float = 0.02, h_dn: float = 0.02,
+                 capacity: int = 1024):
+        if h_up < 0 or h_dn < 0:
+            raise ValueError(f"h_up/h_dn must be >= 0, got {h_up}/{h_dn}")
+        self.labels, self.thresholds = band_table(bands)
+        self.h_up, self.h_dn = h_up, h_dn
+        self.codes = np.full(max(1, capacity), NO_BAND, dtype=np.uint8)
+        self._ids: Dict[Hashable, int] = {}
+
+    def ids_for(self, keys: Iterable[Hashable]) -> np.ndarray:
+        # hashable keys -> dense entity ids, registering new keys
+        ids = self._ids
+        return np.fromiter((ids.setdefault(k, len(ids)) for k in keys), dtype=np.int64)
+
+    def _reserve(self, n: int) -> None:
+        if n > len(self.codes):
+            grown = np.full(max(n, 2 * len(self.codes)), NO_BAND, dtype=np.uint8)
+            grown[:len(self.codes)] = self.codes
+            self.codes = grown
+
+    def update(self, ids, x, emit_initial: bool = False) -> BandTransitions:
+        # Apply RSI_env values x to entities ids; returns only the band changes
+        # (first sightings too when emit_initial=True)
+        ids = np.asarray(ids, dtype=np.int64)
+        x = np.asarray(x, dtype=np.float64)
+        if ids.shape != x.shape or ids.ndim != 1:
+            raise ValueError(f"ids and x must be 1-d and the same shape, got {ids.shape} and {x.shape}")
+        if len(ids) == 0:
+            empty = np.zeros(0, dtype=np.int64)
+            return BandTransitions(empty, empty, empty.astype(np.uint8), empty.astype(np.uint8))
+        if ids.min() < 0:
+            raise ValueError("entity ids must be >= 0")
+        self._reserve(int(ids.max()) + 1)
+        raw = band_codes(x, self.thresholds)
+        up = band_codes(x - self.h_up, self.thresholds)
+        dn = band_codes(x + self.h_dn, self.thresholds)
+        # rank of each row among rows of the same entity -> rounds of unique entities, in batch order
+        order = np.argsort(ids, kind="stable")
+        sid = ids[order]
+        first = np.r_[True, sid[1:] != sid[:-1]]
+        start = np.maximum.accumulate(np.where(first, np.arange(len(sid)), 0))
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(sid)) - start
+        by_rank = np.argsort(rank, kind="stable")
+        bounds = np.cumsum(np.bincount(rank)).tolist()
+        old = np.empty(len(ids), dtype=np.uint8)
+        new = np.empty(len(ids), dtype=np.uint8)
+        codes = self.codes
+        for lo, hi in zip([0] + bounds[:-1], bounds):
+            rows = by_rank[lo:hi]
+            e = ids[rows]
+            cur = codes[e]
+            nxt = np.where(up[rows] > cur, up[rows], np.where(dn[rows] < cur, dn[rows], cur))
+            nxt = np.where(cur == NO_BAND, raw[rows], nxt)
+            old[rows], new[rows] = cur, nxt
+            codes[e] = nxt
+        changed = (old != new) & ((old != NO_BAND) | emit_initial)
+        rows = np.flatnonzero(changed)
+        return BandTransitions(rows, ids[rows], old[rows], new[rows])
+
+    def update_keys(self, keys: Iterable[Hashable], x, emit_initial: bool = False) -> BandTransitions:
+        return self.update(self.ids_for(keys), x, emit_initial)
+
+    def band(self, key: Hashable) -> Optional[str]:
+        # current label for a key (None if never observed; ids_for may register keys past the arrays)
+        i = self._ids.get(key)
+        if i is None or i >= len(self.codes) or self.codes[i] == NO_BAND:
+            return None
+        return self.labels[self.codes[i]]
+
+def rsi_groups(groups: Sequence[Sequence[Tuple[float, float, float]]], eps_w: float = EPS_W, eps_a: float = EPS_A,
+               dtype: str = "float64", c: float = 1.0) -> List[float]:
+    # Drop-in batch form of [rsi_from_items(g, c=c) for g in groups]
+    e_in, e_out, w, offsets = pack_groups(groups)
+    return rsi_batch(e_in, e_out, w, offsets=offsets, c=c, eps_w=eps_w, eps_a=eps_a, dtype=dtype).tolist()
+
+if __name__ == "__main__":
+    # Smoke: the demo_beam candidates through the batch path
+    from ssm_ai_quickstart import rsi_from_items
+    groups = [[(0.2, 0.5, 1.0)], [(0.3, 0.4, 1.0)], []]
+    print("batch :", [f"{x:.6f}" for x in rsi_groups(groups)])
+    print("batch32:", [f"{x:.6f}" for x in rsi_groups(groups, dtype="float32")])
+    print("scalar:", [f"{rsi_from_items(g):.6f}" for g in groups])
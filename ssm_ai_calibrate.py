@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# Lens calibration helpers (stdlib; NumPy used for array input when installed)
+# Unit (step 3) from a quantile sketch; lens gain c (step 4) from saturation / dead-zone targets.
+#
+# Unit := max(median(|e_raw|), 1e-6) from a bounded-memory, mergeable quantile sketch instead of a sorted sample,
+# so Unit can be computed per service over any number of items and per-shard sketches merged afterwards.
+# The lens then feeds e := e_raw / Unit into map_to_alignment(e_in, e_out, c) as before.
+#
+# Sketch: log-spaced buckets (DDSketch-style). |x| lands in bucket k = ceil(log(|x|) / log(gamma)),
+# gamma := (1 + rel_err) / (1 - rel_err), and a bucket reports 2*gamma^k / (gamma + 1), so every quantile
+# is within rel_err (relative) of an actual sample value at that rank. Buckets are integer counts:
+# merging is exact and any item order / shard split gives the same sketch (hence the same Unit).
+#
+# Usage:
+#   python ssm_ai_calibrate.py --column e_raw samples.csv              # -> {"Unit": .., "n": .., ...}
+#   python ssm_ai_calibrate.py --column e_raw shard-07.csv --save shard-07.json
+#   python ssm_ai_calibrate.py --merge shard-*.json
+#   python ssm_ai_calibrate.py --column e_raw samples.csv --tune-c       # also pick c for e := e_raw / Unit
+
+import argparse
+import csv
+import json
+import sys
+from bisect import bisect_left
+from math import atanh, ceil, log, sqrt
+from typing import Callable, Dict, Iterable, NamedTuple, Optional, Tuple, Union
+
+UNIT_FLOOR = 1e-6      # Unit := max(q, 1e-6) (CALIBRATION step 3)
+REL_ERR = 0.005        # sketch accuracy: quantiles within 0.5% of a true sample value
+MAX_BINS = 4096        # memory bound; at REL_ERR covers |x| over ~18 decades before the lowest bins collapse
+MIN_VALUE = 1e-12      # |x| <= MIN_VALUE counts as zero
+SAT_A, DEAD_A = 0.90, 0.10          # |a| >= SAT_A is saturated, |a| < DEAD_A is dead zone (CALIBRATION step 4)
+SAT_MAX, DEAD_MAX = 0.10, 0.70      # targets: <= 10% saturated, <= 70% dead zone
+C_RANGE = (1e-9, 1e9)               # search bounds for c
+
+# ---------- quantile sketch ----------
+class AbsQuantileSketch:
+    # Mergeable quantile sketch of |x|: {bucket key: count} plus a zero count, at most max_bins keys.
+    # Past max_bins the lowest buckets are folded upward (only the low tail loses accuracy; the median
+    # of a sample spanning < ~18 decades never does). Plain attributes, so it pickles for process pools.
+    __slots__ = ("rel_err", "min_value", "max_bins", "gamma", "_inv_log_gamma", "bins", "zero", "count",
+                 "_low_key")
+
+    def __init__(self, rel_err: float = REL_ERR, max_bins: int = MAX_BINS, min_value: float = MIN_VALUE):
+        if not 0.0 < rel_err < 1.0 or max_bins < 1 or min_value <= 0.0:
+            raise ValueError("need 0 < rel_err < 1, max_bins >= 1, min_value > 0")
+        self.rel_err, self.max_bins, self.min_value = rel_err, max_bins, min_value
+        self.gamma = (1.0 + rel_err) / (1.0 - rel_err)
+        self._inv_log_gamma = 1.0 / log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero = self.count = 0
+        self._low_key: Optional[int] = None     # set once buckets have been collapsed
+
+    def add(self, x: float) -> "AbsQuantileSketch":
+        x = abs(x)
+        self.count += 1
+        if x <= self.min_value:
+            self.zero += 1
+            return self
+        k = ceil(log(x) * self._inv_log_gamma)
+        if self._low_key is not None and k < self._low_key:
+            k = self._low_key
+        bins = self.bins
+        if k in bins:
+            bins[k] += 1
+        else:
+            bins[k] = 1
+            if len(bins) > self.max_bins:
+                self._collapse()
+        return self
+
+    def add_many(self, xs: Iterable[float]) -> "AbsQuantileSketch":
+        if hasattr(xs, "dtype"):                 # NumPy array: bucket the whole array in one pass
+            return self._add_array(xs)
+        for x in xs:
+            self.add(x)
+        return self
+
+    def _add_array(self, xs) -> "AbsQuantileSketch":
+        import numpy as np
+        x = np.abs(np.asarray(xs, dtype=np.float64).ravel())
+        big = x > self.min_value
+        self.count += x.size
+        self.zero += int(x.size - np.count_nonzero(big))
+        keys = np.ceil(np.log(x[big]) * self._inv_log_gamma).astype(np.int64)
+        if self._low_key is not None:
+            np.maximum(keys, self._low_key, out=keys)
+        bins = self.bins
+        for k, n in zip(*(a.tolist() for a in np.unique(keys, return_counts=True))):
+            bins[k] = bins.get(k, 0) + n
+        if len(bins) > self.max_bins:
+            self._collapse()
+        return self
+
+    def _collapse(self) -> None:
+        keys = sorted(self.bins)
+        drop, keep = keys[:len(keys) - self.max_bins], keys[len(keys) - self.max_bins]
+        self.bins[keep] += sum(self.bins.pop(k) for k in drop)
+        self._low_key = keep
+
+    def merge(self, other: "AbsQuantileSketch") -> "AbsQuantileSketch":
+        # Exact: bucket counts add. Both sketches must share rel_err and min_value.
+        if (self.rel_err, self.min_value) != (other.rel_err, other.min_value):
+            raise ValueError("cannot merge sketches with different rel_err / min_value")
+        for k, n in other.bins.items():
+            self.bins[k] = self.bins.get(k, 0) + n
+        self.zero += other.zero
+        self.count += other.count
+        low = [k for k in (self._low_key, other._low_key) if k is not None]
+        if low:
+            self._low_key = max(low)
+            below = [k for k in self.bins if k < self._low_key]
+            if below:
+                self.bins[self._low_key] = self.bins.get(self._low_key, 0) + sum(self.bins.pop(k) for k in below)
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+        return self
+
+    def quantile(self, q: float) -> float:
+        # Value at rank floor(q*(n-1)) of the sorted |x| sample, to within rel_err (0.0 for an empty sketch)
+        if not 0.0 <= q <= 1.0:
+            raise ValueError(f"q must be in [0, 1], got {q}")
+        if self.count == 0:
+            return 0.0
+        rank = int(q * (self.count - 1))
+        seen = self.zero
+        if rank < seen:
+            return 0.0
+        for k in sorted(self.bins):
+            seen += self.bins[k]
+            if rank < seen:
+                return 2.0 * self.gamma ** k / (self.gamma + 1.0)
+        raise AssertionError("bucket counts do not add up to count")
+
+    def count_below(self, x: float) -> int:
+        # number of |x_i| < x, bucket-resolution (each bucket counted at its reported value)
+        g, scale = self.gamma, 2.0 / (self.gamma + 1.0)
+        return (self.zero if x > 0.0 else 0) + sum(c for k, c in self.bins.items() if scale * g ** k < x)
+
+    def median(self) -> float:
+        return self.quantile(0.5)
+
+    def unit(self, floor: float = UNIT_FLOOR) -> float:
+        # lens Unit := max(median(|e_raw|), floor)
+        return max(self.median(), floor)
+
+    def to_dict(self) -> dict:
+        return {"rel_err": self.rel_err, "max_bins": self.max_bins, "min_value": self.min_value,
+                "count": self.count, "zero": self.zero, "low_key": self._low_key,
+                "bins": {str(k): n for k, n in sorted(self.bins.items())}}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "AbsQuantileSketch":
+        s = cls(d["rel_err"], d["max_bins"], d["min_value"])
+        s.count, s.zero, s._low_key = d["count"], d["zero"], d["low_key"]
+        s.bins = {int(k): n for k, n in d["bins"].items()}
+        return s
+
+    def __repr__(self) -> str:
+        return f"AbsQuantileSketch(n={self.count}, bins={len(self.bins)}, median~{self.median():.6g})"
+
+def lens_unit(e_raw: Iterable[float], rel_err: float = REL_ERR, floor: float = UNIT_FLOOR) -> float:
+    # One-shot Unit for an iterable (or NumPy array) of raw lens values
+    return AbsQuantileSketch(rel_err).add_many(e_raw).unit(floor)
+
+# ---------- lens gain c ----------
+class CTuning(NamedTuple):
+    c: float
+    saturation: float      # mean(|tanh(c*e)| >= SAT_A)
+    dead_zone: float       # mean(|tanh(c*e)| <  DEAD_A)
+    feasible: bool         # both targets met
+
+def _count_below_fn(e: Union[Iterable[float], AbsQuantileSketch]) -> Tuple[Callable[[float], int], int]:
+    # (x -> number of |e_i| < x, n); exact from one sort of the sample, or bucket-resolution from a sketch
+    if isinstance(e, AbsQuantileSketch):
+        return e.count_below, e.count
+    if hasattr(e, "dtype"):
+        import numpy as np
+        a = np.sort(np.abs(np.asarray(e, dtype=np.float64).ravel()))
+        return (lambda x: int(np.searchsorted(a, x, "left"))), a.size
+    a = sorted(abs(x) for x in e)
+    return (lambda x: bisect_left(a, x)), len(a)
+
+def _boundary(ok: Callable[[float], bool], good: float, bad: float) -> float:
+    # bisection in log c between ok(good) and not ok(bad); returns the last c still ok, stepped back by a
+    # relative 1e-9 so an item sitting exactly on the threshold is not decided by tanh rounding
+    for _ in range(200):
+        mid = sqrt(good * bad)
+        if mid == good or mid == bad:
+            break
+        if ok(mid):
+            good = mid
+        else:
+            bad = mid
+    return good * (1.0 + 1e-9) if good > bad else good * (1.0 - 1e-9)
+
+def tune_c(e: Union[Iterable[float], AbsQuantileSketch], unit: float = 1.0, c0: float = 1.0,
+           sat_max: float = SAT_MAX, dead_max: float = DEAD_MAX) -> CTuning:
+    # CALIBRATION step 4 without trial and error. e := e_raw / unit (a sample, NumPy array or sketch of e_raw).
+    # |tanh(c*e)| >= SAT_A  <=>  |e| >= atanh(SAT_A)/c, so both rates are quantile lookups of |e|:
+    # saturation rises with c, dead zone falls with c. Keep c0 if it meets both targets, else move it
+    # just far enough (lower c for saturation, raise c for dead zone). If no c meets both, take the c
+    # where the two overshoots are equal (unless that is no better than c0).
+    below, n = _count_below_fn(e)
+    if n == 0:
+        raise ValueError("tune_c needs a non-empty sample")
+    t_sat, t_dead = atanh(SAT_A) * unit, atanh(DEAD_A) * unit
+    sat = lambda c: (n - below(t_sat / c)) / n
+    dead = lambda c: below(t_dead / c) / n
+    ok_sat = lambda c: sat(c) <= sat_max
+    ok_dead = lambda c: dead(c) <= dead_max
+    c_min, c_max = C_RANGE
+    c = c0
+    if not ok_sat(c) and ok_sat(c_min):
+        c = _boundary(ok_sat, c_min, c)
+    elif not ok_dead(c) and ok_dead(c_max):
+        c = _boundary(ok_dead, c_max, c)
+    if not (ok_sat(c) and ok_dead(c)):
+        worst = lambda c: max(sat(c) - sat_max, dead(c) - dead_max)
+        cb = _boundary(lambda c: sat(c) - sat_max <= dead(c) - dead_max, c_min, c_max)
+        c = cb if worst(cb) < worst(c0) else c0
+    return CTuning(c, sat(c), dead(c), ok_sat(c) and ok_dead(c))
+
+# ---------- CLI ----------
+def _column_values(path: str, column: str) -> Iterable[float]:
+    f = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+    try:
+        for row in csv.DictReader(f):
+            v = row.get(column)
+            if v not in (None, ""):
+                yield float(v)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+def main():
+    ap = argparse.ArgumentParser(description="Lens Unit from a mergeable quantile sketch of |e_raw|.")
+    ap.add_argument("inputs", nargs="*", help="CSV files with an e_raw column ('-' = STDIN)")
+    ap.add_argument("--column", default="e_raw", help="CSV column holding raw lens values")
+    ap.add_argument("--merge", nargs="+", default=[], metavar="SKETCH", help="Saved sketches (.json) to merge in")
+    ap.add_argument("--save", help="Write the resulting sketch as JSON (for merging later)")
+    ap.add_argument("--rel-err", type=float, default=REL_ERR)
+    ap.add_argument("--floor", type=float, default=UNIT_FLOOR, help="Unit floor")
+    ap.add_argument("--tune-c", action="store_true", help="Also pick lens gain c for e := e_raw / Unit")
+    args = ap.parse_args()
+    if not args.inputs and not args.merge:
+        ap.error("give CSV inputs and/or --merge sketches")
+
+    sketch = AbsQuantileSketch(args.rel_err)
+    for path in args.merge:
+        with open(path, encoding="utf-8") as f:
+            sketch.merge(AbsQuantileSketch.from_dict(json.load(f)))
+    for path in args.inputs:
+        sketch.add_many(_column_values(path, args.column))
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(sketch.to_dict(), f, separators=(",", ":"))
+    out = {"Unit": sketch.unit(args.floor), "median_abs": sketch.median(), "n": sketch.count,
+           "rel_err": sketch.rel_err, "bins": len(sketch.bins)}
+    if args.tune_c:
+        out.update(tune_c(sketch, unit=out["Unit"])._asdict())
+    print(json.dumps(out))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# Replay-ready decision log writer (stdlib only): per-decision rows as CSV or compact fixed-width binary
+# Row schema (README_Public):
+#   iso_utc, svc, knobs_hash, dtype, m, a, U, W, RSI, g_t, RSI_env, band, division_policy, note
+#
+# Binary ".ssmlog" layout (little-endian), one file per rotation:
+#   header  : 8s magic "SSMLOG2\n", uint32 record_size, uint32 header_size (64), padding to 64 bytes
+#   records : fixed-width, RECORD struct below; the float64 lanes are stored raw (no text formatting)
+#   notes   : UTF-8 note text, concatenated; a record points at its note with (note_off, note_len)
+#   footer  : UTF-8 JSON {"fields", "dicts": {col: [value, ...]}, "rows", "notes_offset", "notes_size"},
+#             uint64 footer_len, 8s "SSMEND1\n"
+# Low-cardinality string columns are dictionary-encoded to uint32 codes (index into footer dicts[col]);
+# note is free text, so it is a length-prefixed string column instead (never held in memory or the footer).
+# iso_utc is stored as int64 microseconds since the Unix epoch. SSMLOG1 files (note dictionary-encoded)
+# are still readable.
+
+import csv
+import json
+import os
+import shutil
+import struct
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+LOG_FIELDS = [
+    "iso_utc", "svc", "knobs_hash", "dtype", "m", "a", "U", "W",
+    "RSI", "g_t", "RSI_env", "band", "division_policy", "note",
+]
+FLOAT_FIELDS = ["m", "a", "U", "W", "RSI", "g_t", "RSI_env"]
+DICT_FIELDS = ["svc", "knobs_hash", "dtype", "band", "division_policy"]
+DEFAULTS = {"dtype": "float64", "division_policy": "strict", "note": ""}
+
+MAGIC = b"SSMLOG2\n"
+MAGIC_V1 = b"SSMLOG1\n"
+END_MAGIC = b"SSMEND1\n"
+HEADER_SIZE = 64
+RECORD = struct.Struct("<q7d5IQI")     # ts_us, FLOAT_FIELDS..., DICT_FIELDS codes, note_off, note_len
+RECORD_V1 = struct.Struct("<q7d6I")    # SSMLOG1: ts_us, FLOAT_FIELDS..., DICT_FIELDS + note codes
+HEADER = struct.Struct("<8sII")
+TRAILER = struct.Struct("<Q8s")
+
+# ---------- timestamps ----------
+def to_epoch_us(ts: Union[str, datetime, int, float]) -> int:
+    # ISO-8601 (trailing "Z" ok), datetime (naive = UTC) or epoch seconds -> int microseconds
+    if isinstance(ts, (int, float)):
+        return round(ts * 1_000_000)
+    if isinstance(ts, str):
+        ts = datetime.fromisoformat(ts[:-1] + "+00:00" if ts.endswith("Z") else ts)
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    delta = ts - datetime(1970, 1, 1, tzinfo=timezone.utc)
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+def from_epoch_us(us: int) -> str:
+    dt = datetime.fromtimestamp(us // 1_000_000, tz=timezone.utc).replace(microsecond=us % 1_000_000)
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+# ---------- writer ----------
+class DecisionLogWriter:
+    """
+    Buffered writer for per-decision rows, fmt "bin" (default) or "csv".
+    Files are named <base>-<NNNNNN>.ssmlog / .csv and rotate every rotate_rows rows.
+    Rows are dicts keyed by LOG_FIELDS; dtype, division_policy and note fall back to DEFAULTS.
+    dtype sets the writer's default for the dtype column ("float32" for rows scored in float32 mode,
+    which the replay verifier then checks at its float32 tolerance).
+    """
+
+    def __init__(self, base: str, fmt: str = "bin", rotate_rows: int = 1_000_000, buffer_rows: int = 8192,
+                 dtype: str = DEFAULTS["dtype"]):
+        if fmt not in ("bin", "csv"):
+            raise ValueError(f"fmt must be 'bin' or 'csv', got {fmt!r}")
+        if rotate_rows < 1 or buffer_rows < 1:
+            raise ValueError("rotate_rows and buffer_rows must be >= 1")
+        self.base, self.fmt = base, fmt
+        self.defaults = dict(DEFAULTS, dtype=dtype)
+        self.rotate_rows, self.buffer_rows = rotate_rows, buffer_rows
+        self.paths: List[str] = []
+        self._f = None
+        self._csv = None
+        self._rows_in_file = 0
+        self._buf: List = []
+        self._dicts: Dict[str, Dict[str, int]] = {}
+        self._notes = None                 # binary: note text spooled to <path>.notes, appended on close
+        self._note_pos = 0
+        self._last_note = ("", 0)          # (text, offset): a repeated note reuses the previous bytes
+
+    # -- file lifecycle --
+    def _open_next(self) -> None:
+        d = os.path.dirname(self.base)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        path = f"{self.base}-{len(self.paths):06d}.{'ssmlog' if self.fmt == 'bin' else 'csv'}"
+        self.paths.append(path)
+        self._rows_in_file = 0
+        if self.fmt == "bin":
+            self._f = open(path, "wb")
+            self._f.write(HEADER.pack(MAGIC, RECORD.size, HEADER_SIZE).ljust(HEADER_SIZE, b"\0"))
+            self._dicts = {col: {} for col in DICT_FIELDS}
+            self._notes = open(path + ".notes", "w+b")
+            self._note_pos, self._last_note = 0, ("", 0)
+        else:
+            self._f = open(path, "w", newline="", encoding="utf-8")
+            self._csv = csv.writer(self._f)
+            self._csv.writerow(LOG_FIELDS)
+
+    def _close_current(self) -> None:
+        if self._f is None:
+            return
+        self._flush_buffer()
+        if self.fmt == "bin":
+            notes_offset = HEADER_SIZE + self._rows_in_file * RECORD.size
+            self._notes.seek(0)
+            shutil.copyfileobj(self._notes, self._f)
+            self._notes.close()
+            os.remove(self._notes.name)
+            self._notes = None
+            dicts = {col: list(codes) for col, codes in self._dicts.items()}   # insertion order == code order
+            footer = json.dumps({"fields": LOG_FIELDS, "dicts": dicts, "rows": self._rows_in_file,
+                                 "notes_offset": notes_offset, "notes_size": self._note_pos},
+                                separators=(",", ":")).encode("utf-8")
+            self._f.write(footer)
+            self._f.write(TRAILER.pack(len(footer), END_MAGIC))
+        self._f.close()
+        self._f = self._csv = None
+
+    # -- rows --
+    def _encode(self, row: Dict) -> bytes:
+        get = row.get
+        codes = []
+        for col in DICT_FIELDS:
+            v = get(col)
+            if v is None:
+                v = self.defaults.get(col, "")
+            table = self._dicts[col]
+            code = table.get(v)
+            if code is None:
+                code = table[v] = len(table)
+            codes.append(code)
+        return RECORD.pack(to_epoch_us(row["iso_utc"]), *[float(row[k]) for k in FLOAT_FIELDS], *codes,
+                           *self._note(get("note")))
+
+    def _note(self, note: Optional[str]) -> tuple:
+        # (note_off, note_len) into this file's notes region
+        if note is None:
+            note = self.defaults["note"]
+        if not note:
+            return 0, 0
+        if note == self._last_note[0]:
+            return self._last_note[1], len(note.encode("utf-8"))
+        data = note.encode("utf-8")
+        off = self._note_pos
+        self._notes.write(data)
+        self._note_pos += len(data)
+        self._last_note = (note, off)
+        return off, len(data)
+
+    def _as_csv(self, row: Dict) -> List:
+        out = []
+        for col in LOG_FIELDS:
+            v = row.get(col)
+            if v is None:
+                v = self.defaults.get(col, "")
+            elif col == "iso_utc" and not isinstance(v, str):
+                v = from_epoch_us(to_epoch_us(v))
+            out.append(v)
+        return out
+
+    def write(self, row: Dict) -> None:
+        if self._f is None or self._rows_in_file >= self.rotate_rows:
+            self._close_current()
+            self._open_next()
+        self._buf.append(self._encode(row) if self.fmt == "bin" else self._as_csv(row))
+        self._rows_in_file += 1
+        if len(self._buf) >= self.buffer_rows:
+            self._flush_buffer()
+
+    def write_many(self, rows: Iterable[Dict]) -> None:
+        for row in rows:
+            self.write(row)
+
+    def _flush_buffer(self) -> None:
+        if not self._buf:
+            return
+        if self.fmt == "bin":
+            self._f.write(b"".join(self._buf))
+        else:
+            self._csv.writerows(self._buf)
+        self._buf.clear()
+
+    def flush(self) -> None:
+        if self._f is not None:
+            self._flush_buffer()
+            self._f.flush()
+
+    def close(self) -> None:
+        self._close_current()
+
+    def __enter__(self) -> "DecisionLogWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+# ---------- reader (binary) ----------
+def read_footer(path: str) -> Dict:
+    # {"fields", "dicts", "rows", "notes_offset", "notes_size"} plus "version" and
+    # "data_offset"/"record_size" for fixed-width access (mmap, numpy)
+    with open(path, "rb") as f:
+        magic, record_size, header_size = HEADER.unpack(f.read(HEADER.size))
+        if magic not in (MAGIC, MAGIC_V1):
+            raise ValueError(f"{path}: not an SSM-AI binary log (bad magic)")
+        f.seek(-TRAILER.size, os.SEEK_END)
+        footer_len, end_magic = TRAILER.unpack(f.read(TRAILER.size))
+        if end_magic != END_MAGIC:
+            raise ValueError(f"{path}: truncated log (no footer; writer not closed?)")
+        f.seek(-(TRAILER.size + footer_len), os.SEEK_END)
+        meta = json.loads(f.read(footer_len).decode("utf-8"))
+    meta["data_offset"], meta["record_size"] = header_size, record_size
+    meta["version"] = 2 if magic == MAGIC else 1
+    return meta
+
+def open_records(path: str):
+    # numpy.memmap of the fixed-width records (structured dtype: ts_us, FLOAT_FIELDS, DICT_FIELDS codes,
+    # note_off/note_len; SSMLOG1: a "note" code instead) + footer
+    import numpy as np
+    meta = read_footer(path)
+    tail = [("note_off", "<u8"), ("note_len", "<u4")] if meta["version"] == 2 else [("note", "<u4")]
+    dtype = np.dtype([("ts_us", "<i8")] + [(k, "<f8") for k in FLOAT_FIELDS] + [(k, "<u4") for k in DICT_FIELDS]
+                     + tail)
+    if dtype.itemsize != meta["record_size"]:
+        raise ValueError(f"{path}: record_size {meta['record_size']} != expected {dtype.itemsize}")
+    if meta["rows"] == 0:
+        return np.zeros(0, dtype=dtype), meta
+    return np.memmap(path, dtype=dtype, mode="r", offset=meta["data_offset"], shape=(meta["rows"],)), meta
+
+def iter_rows(path: str) -> Iterator[Dict]:
+    # Decode a binary log back to dict rows (iso_utc as ISO-8601 text); CSV logs read with csv.DictReader
+    meta = read_footer(path)
+    v1 = meta["version"] == 1
+    cols = DICT_FIELDS + ["note"] if v1 else DICT_FIELDS
+    dicts = [meta["dicts"][col] for col in cols]
+    with open(path, "rb") as f:
+        f.seek(meta["data_offset"])
+        data = f.read(meta["rows"] * meta["record_size"])
+        notes = b"" if v1 else f.read(meta["notes_size"])
+    n = len(cols)
+    for rec in (RECORD_V1 if v1 else RECORD).iter_unpack(data):
+        row = {"iso_utc": from_epoch_us(rec[0])}
+        row.update(zip(FLOAT_FIELDS, rec[1:8]))
+        row.update((col, d[code]) for col, d, code in zip(cols, dicts, rec[8:8 + n]))
+        if not v1:
+            off, length = rec[8 + n:]
+            row["note"] = notes[off:off + length].decode("utf-8")
+        yield {k: row[k] for k in LOG_FIELDS}
+
+if __name__ == "__main__":
+    # Smoke: write the demo_beam decisions in both formats and read the binary one back
+    import tempfile
+    from ssm_ai_quickstart import UWAccumulator, apply_gate, band_of
+    rows = []
+    for svc, items in (("candA", [(0.2, 0.5, 1.0)]), ("candB", [(0.3, 0.4, 1.0)])):
+        acc = UWAccumulator().add_many(items)
+        rsi = acc.rsi()
+        env = apply_gate(rsi, 0.81)
+        rows.append({"iso_utc": "2025-01-01T00:00:00Z", "svc": svc, "knobs_hash": "demo", "m": 1.0,
+                     "a": acc.a_out(), "U": acc.V_out, "W": acc.W, "RSI": rsi, "g_t": 0.81, "RSI_env": env,
+                     "band": band_of(env)})
+    with tempfile.TemporaryDirectory() as d:
+        for fmt in ("bin", "csv"):
+            with DecisionLogWriter(os.path.join(d, "decisions"), fmt=fmt) as w:
+                w.write_many(rows)
+            print(fmt, [os.path.basename(p) for p in w.paths], os.path.getsize(w.paths[0]), "bytes")
+        for row in iter_rows(os.path.join(d, "decisions-000000.ssmlog")):
+            print(row)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# Shard-parallel SSM-AI scoring (stdlib only): fixed-size shards -> per-shard U/V/W in a process pool -> ordered merge
+# The U/W fuse is order/shard invariant, so the split is exact math. For reproducible floats the shard
+# boundaries depend only on shard_size (never on the worker count) and partials merge in shard order,
+# so 1 worker and 64 workers give the same bits. With summation="exact" the bits also survive a
+# different shard_size or item order (see UWAccumulator).
+# Dispatch: a list/tuple input on a platform with fork() is inherited by the workers at fork time and each
+# task is just a (start, end) range, so the parent never slices or pickles items; any other iterable
+# (generators, spawn-only platforms) falls back to pickled shards, consumed lazily. Only one fork-range run
+# holds the module-level input at a time; a concurrent call (another thread, or a nested run) takes the
+# pickled-shard path instead of overwriting it.
+
+import multiprocessing as mp
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from ssm_ai_quickstart import EPS_A, EPS_W, UWAccumulator
+
+SHARD_SIZE = 65536        # items per shard; part of the reproducibility contract, keep fixed across pool sizes
+GROUPS_PER_SHARD = 1024   # candidates per shard for rsi_groups_parallel
+
+_SHARED: Optional[Sequence] = None   # the input while a fork pool runs; workers read their ranges from it
+_SHARED_LOCK = threading.Lock()      # held by the run that owns _SHARED (not reentrant: others don't wait)
+
+# ---------- sharding ----------
+def _shards(items: Iterable, shard_size: int) -> Iterator[list]:
+    # contiguous shards of shard_size (last may be short); consumes items lazily
+    if shard_size < 1:
+        raise ValueError(f"shard_size must be >= 1, got {shard_size}")
+    it = iter(items)
+    while True:
+        shard = list(islice(it, shard_size))
+        if not shard:
+            return
+        yield shard
+
+def _ranges(n: int, shard_size: int) -> Iterator[Tuple[int, int]]:
+    # (start, end) of the same contiguous shards _shards would cut from n items
+    if shard_size < 1:
+        raise ValueError(f"shard_size must be >= 1, got {shard_size}")
+    for start in range(0, n, shard_size):
+        yield start, min(n, start + shard_size)
+
+def _workers(workers: Optional[int]) -> int:
+    return max(1, workers if workers is not None else (os.cpu_count() or 1))
+
+def _ordered_map(fn: Callable, shards: Iterable, workers: int, *args, mp_context=None) -> Iterator:
+    # fn(shard, *args) per shard, results yielded in shard order; at most 2*workers shards in flight
+    if workers <= 1:
+        for shard in shards:
+            yield fn(shard, *args)
+        return
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context) as ex:
+        pending = deque()
+        for shard in shards:
+            pending.append(ex.submit(fn, shard, *args))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def _map_shards(fn: Callable, data: Iterable, shard_size: int, workers: int, *args) -> Iterator:
+    # fn(shard, *args) per contiguous shard of data, in shard order; ranges over fork-inherited data when possible
+    global _SHARED
+    if (workers > 1 and isinstance(data, (list, tuple)) and "fork" in mp.get_all_start_methods()
+            and _SHARED_LOCK.acquire(blocking=False)):
+        _SHARED = data
+        try:
+            yield from _ordered_map(_on_range, _ranges(len(data), shard_size), workers, fn, *args,
+                                    mp_context=mp.get_context("fork"))
+        finally:
+            _SHARED = None
+            _SHARED_LOCK.release()
+        return
+    yield from _ordered_map(fn, _shards(data, shard_size), workers, *args)
+
+# ---------- workers (top-level so they pickle) ----------
+def _on_range(bounds: Tuple[int, int], fn: Callable, *args):
+    # runs in a forked worker: the shard is a slice of the inherited input, nothing was pickled
+    start, end = bounds
+    return fn(_SHARED[start:end], *args)
+
+def _shard_acc(shard: List[Tuple[float, float, float]], c: float, eps_a: float, summation: str) -> UWAccumulator:
+    return UWAccumulator(c=c, eps_a=eps_a, summation=summation).add_many(shard)
+
+def _shard_rsi(groups: List[Sequence[Tuple[float, float, float]]], c: float, eps_w: float, eps_a: float,
+               summation: str) -> List[float]:
+    return [UWAccumulator(c=c, eps_a=eps_a, summation=summation).add_many(g).rsi(eps_w) for g in groups]
+
+# ---------- one large item set ----------
+def uvw_parallel(items: Iterable[Tuple[float, float, float]], workers: Optional[int] = None,
+                 shard_size: int = SHARD_SIZE, c: float = 1.0, eps_a: float = EPS_A,
+                 summation: str = "naive") -> UWAccumulator:
+    # Merged U/V/W over all items; deterministic for a given shard_size whatever the worker count
+    total = UWAccumulator(c=c, eps_a=eps_a, summation=summation)
+    for part in _map_shards(_shard_acc, items, shard_size, _workers(workers), c, eps_a, summation):
+        total.merge(part)
+    return total
+
+def rsi_parallel(items: Iterable[Tuple[float, float, float]], workers: Optional[int] = None,
+                 shard_size: int = SHARD_SIZE, c: float = 1.0, eps_w: float = EPS_W, eps_a: float = EPS_A,
+                 summation: str = "naive") -> float:
+    return uvw_parallel(items, workers, shard_size, c, eps_a, summation).rsi(eps_w)
+
+# ---------- many candidates ----------
+def rsi_groups_parallel(groups: Iterable[Sequence[Tuple[float, float, float]]], workers: Optional[int] = None,
+                        groups_per_shard: int = GROUPS_PER_SHARD, c: float = 1.0,
+                        eps_w: float = EPS_W, eps_a: float = EPS_A, summation: str = "naive") -> List[float]:
+    # [rsi_from_items(g) for g in groups] across a pool; each group is scored whole, so results are bit-identical
+    out: List[float] = []
+    for part in _map_shards(_shard_rsi, groups, groups_per_shard, _workers(workers), c, eps_w, eps_a, summation):
+        out.extend(part)
+    return out
+
+if __name__ == "__main__":
+    # Smoke + summation benchmark: bits across worker counts / shard sizes, and cost per mode
+    import random
+    import time
+    from ssm_ai_quickstart import SUMMATION_MODES
+    rng = random.Random(7)
+    items = [(rng.gauss(0, 1), rng.gauss(0, 1), rng.random()) for _ in range(400000)]
+    for mode in SUMMATION_MODES:
+        for n, size in ((1, SHARD_SIZE), (_workers(None), SHARD_SIZE), (1, 1000)):
+            t0 = time.perf_counter()
+            acc = uvw_parallel(items, workers=n, shard_size=size, summation=mode)
+            print(f"{mode:<8s} workers={n:<3d} shard={size:<6d} RSI={acc.rsi()!r:<22s} {time.perf_counter() - t0:.3f}s")
+
+    # Dispatch benchmark (1M items, naive): fork-inherited ranges vs pickled shards. Parent CPU is the serial
+    # part of a parallel run, so serial/parent_cpu is the speedup ceiling; wall speedup needs free cores.
+    items = [(rng.gauss(0, 1), rng.gauss(0, 1), rng.random()) for _ in range(1000000)]
+    n = max(2, _workers(None))
+    t0 = time.perf_counter()
+    base = UWAccumulator().add_many(items)
+    serial = time.perf_counter() - t0
+    print(f"serial add_many      {serial:.3f}s  (cpus={os.cpu_count()})")
+    for label, data in (("ranges (fork)", items), ("pickled shards", iter(items))):
+        t0, c0 = time.perf_counter(), time.process_time()
+        acc = uvw_parallel(data, workers=n)
+        wall, cpu = time.perf_counter() - t0, time.process_time() - c0
+        print(f"{label:<20s} {wall:.3f}s  workers={n} speedup={serial / wall:.2f}x  parent_cpu={cpu:.3f}s "
+              f"ceiling={serial / max(cpu, 1e-9):.0f}x  same_bits={acc.rsi() == uvw_parallel(items, 1).rsi()}")
@@ -2,13 +2,16 @@
 # Minimal, dependency-free SSM-AI quickstart: clamp -> atanh/tanh -> U/W -> RSI -> optional gate
 # All formulas in plain ASCII, observation-only: phi((m,a)) = m
 
-from math import tanh, atanh
-from typing import List, Tuple, Dict
+import heapq
+from bisect import bisect_right
+from math import tanh, atanh, exp, floor, fsum, log
+from typing import Iterable, List, Optional, Tuple, Dict
 
 # ---------- knobs (safe defaults) ----------
 EPS_A = 1e-6        # clamp margin for alignment
 EPS_W = 1e-12       # denominator guard for means (>=1e-8 if float32)
 GAMMA = 1.0         # weights: w := |m|^gamma  (set to 0 for uniform)
+BANDS = {"A++": 0.90, "A+": 0.60, "A0": -0.60, "A-": -0.90, "A--": -1.00}   # manifest form: label -> lower edge
 
 # ---------- helpers ----------
 def clamp_align(a: float, eps_a: float = EPS_A) -> float:
@@ -30,26 +33,448 @@ def map_to_alignment(e_in: float, e_out: float, c: float = 1.0, eps_a: float = E
     a_out = clamp_align(tanh(+c * e_out), eps_a)
     return a_in, a_out
 
+# ---------- lens -> rapidity (fast path) ----------
+def rapidity_max(eps_a: float = EPS_A) -> float:
+    # u_max := atanh(1 - eps_a); the clamp edge in u-space (7.254329 at eps_a = 1e-6)
+    return atanh(1.0 - eps_a)
+
+def map_to_rapidity(e_in: float, e_out: float, c: float = 1.0, u_max: Optional[float] = None) -> Tuple[float, float]:
+    # u_in := clip(-c*e_in, -u_max, u_max), u_out := clip(+c*e_out, -u_max, u_max)
+    # Same as atanh(map_to_alignment(...)) without the tanh->atanh round trip. Clamped lanes are
+    # bit-identical; inside the clamp |u_fast - u_roundtrip| <= 2^-51 / (1 - a^2), a = tanh(|u|),
+    # i.e. the round trip's own rounding noise (<= 4 ulp for |u| <= 1, ~1e-10 at the clamp edge)
+    if u_max is None:
+        u_max = rapidity_max()
+    u_in  = min(u_max, max(-u_max, -c * e_in))
+    u_out = min(u_max, max(-u_max, +c * e_out))
+    return u_in, u_out
+
 # ---------- order-invariant RSI chooser ----------
-def rsi_from_items(items: List[Tuple[float, float, float]], eps_w: float = EPS_W, eps_a: float = EPS_A) -> float:
+def rsi_from_items(items: List[Tuple[float, float, float]], eps_w: float = EPS_W, eps_a: float = EPS_A,
+                   c: float = 1.0) -> float:
     # items: list of (e_in, e_out, w); U += w*atanh(a); W += w; RSI := tanh((V_out - U_in)/max(W, eps_w))
-    U_in = V_out = W = 0.0
-    for e_in, e_out, w in items:
-        a_in, a_out = map_to_alignment(e_in, e_out, c=1.0, eps_a=eps_a)
-        U_in  += w * atanh(a_in)
-        V_out += w * atanh(a_out)
-        W     += w
-    if W <= 0:
-        return 0.0
-    return tanh((V_out - U_in) / max(W, eps_w))
+    # c = lens gain (map_to_alignment); pick it with ssm_ai_calibrate.tune_c
+    return UWAccumulator(c=c, eps_a=eps_a).add_many(items).rsi(eps_w)
+
+# ---------- streaming U/W accumulator (mergeable) ----------
+SUMMATION_MODES = ("naive", "neumaier", "exact")
+_EXACT_ONE = 1 << 1074      # exact mode: lanes held as Python ints in units of 2^-1074 (smallest subnormal)
+
+def _exact_int(x: float) -> int:
+    # float -> exact integer multiple of 2^-1074
+    n, d = x.as_integer_ratio()
+    return n << (1075 - d.bit_length())
+
+def _neumaier(s: float, comp: float, x: float) -> Tuple[float, float]:
+    # compensated add: (s, comp) + x with the rounding error of s + x carried in comp
+    t = s + x
+    comp += (s - t) + x if abs(s) >= abs(x) else (x - t) + s
+    return t, comp
+
+class UWAccumulator:
+    # Running U/W state: U_in += w*atanh(a_in); V_out += w*atanh(a_out); W += w; count += 1
+    # atanh(a) is taken on the rapidity fast path (map_to_rapidity): u := clip(+-c*e, -u_max, u_max)
+    # Order/shard invariant: merge() adds partial sums, so shards combine without re-reading raw items
+    # summation: "naive"    plain float += (fastest; last bits depend on item/shard order)
+    #            "neumaier" compensated sums (error ~1 ulp of the total; still order-dependent in the last bit)
+    #            "exact"    integer sums in units of 2^-1074, rounded once on read: bit-identical for
+    #                       any item order, shard layout and merge order (math.fsum semantics)
+    # In the compensated modes U_in/V_out/W are refreshed from the internal state after every update.
+    __slots__ = ("U_in", "V_out", "W", "count", "c", "eps_a", "u_max", "summation", "_state")
+
+    def __init__(self, c: float = 1.0, eps_a: float = EPS_A, summation: str = "naive"):
+        if summation not in SUMMATION_MODES:
+            raise ValueError(f"summation must be one of {SUMMATION_MODES}, got {summation!r}")
+        self.U_in = self.V_out = self.W = 0.0
+        self.count = 0
+        self.c, self.eps_a = c, eps_a
+        self.u_max = rapidity_max(eps_a)
+        self.summation = summation
+        # neumaier: [sU, cU, sV, cV, sW, cW] ; exact: [iU, iV, iW]
+        self._state = [0.0] * 6 if summation == "neumaier" else [0, 0, 0] if summation == "exact" else None
+
+    def add(self, e_in: float, e_out: float, w: float) -> "UWAccumulator":
+        if self._state is not None:
+            return self.add_many(((e_in, e_out, w),))
+        u_in, u_out = map_to_rapidity(e_in, e_out, c=self.c, u_max=self.u_max)
+        self.U_in  += w * u_in
+        self.V_out += w * u_out
+        self.W     += w
+        self.count += 1
+        return self
+
+    def add_many(self, items: Iterable[Tuple[float, float, float]]) -> "UWAccumulator":
+        # Same arithmetic as repeated add(), with the state and clip inlined in locals for the loop
+        if self._state is not None:
+            return self._add_many_compensated(items)
+        U_in, V_out, W, n = self.U_in, self.V_out, self.W, self.count
+        c, hi = self.c, self.u_max
+        lo = -hi
+        for e_in, e_out, w in items:
+            u_in  = -c * e_in
+            u_out = +c * e_out
+            U_in  += w * (hi if u_in > hi else u_in if u_in > lo else lo)
+            V_out += w * (hi if u_out > hi else u_out if u_out > lo else lo)
+            W     += w
+            n     += 1
+        self.U_in, self.V_out, self.W, self.count = U_in, V_out, W, n
+        return self
+
+    def _add_many_compensated(self, items: Iterable[Tuple[float, float, float]]) -> "UWAccumulator":
+        st, n = self._state, self.count
+        c, hi = self.c, self.u_max
+        lo = -hi
+        if self.summation == "exact":
+            iU, iV, iW = st
+            for e_in, e_out, w in items:
+                u_in  = -c * e_in
+                u_out = +c * e_out
+                iU += _exact_int(w * (hi if u_in > hi else u_in if u_in > lo else lo))
+                iV += _exact_int(w * (hi if u_out > hi else u_out if u_out > lo else lo))
+                iW += _exact_int(w)
+                n  += 1
+            st[:] = iU, iV, iW
+        else:
+            sU, cU, sV, cV, sW, cW = st
+            for e_in, e_out, w in items:
+                u_in  = -c * e_in
+                u_out = +c * e_out
+                sU, cU = _neumaier(sU, cU, w * (hi if u_in > hi else u_in if u_in > lo else lo))
+                sV, cV = _neumaier(sV, cV, w * (hi if u_out > hi else u_out if u_out > lo else lo))
+                sW, cW = _neumaier(sW, cW, w)
+                n += 1
+            st[:] = sU, cU, sV, cV, sW, cW
+        self.count = n
+        self._refresh()
+        return self
+
+    def _refresh(self) -> None:
+        st = self._state
+        if self.summation == "exact":
+            self.U_in, self.V_out, self.W = st[0] / _EXACT_ONE, st[1] / _EXACT_ONE, st[2] / _EXACT_ONE
+        else:
+            self.U_in, self.V_out, self.W = st[0] + st[1], st[2] + st[3], st[4] + st[5]
+
+    def merge(self, other: "UWAccumulator") -> "UWAccumulator":
+        # Shard merge: partial sums add; lens params must match or the lanes are not comparable
+        if (self.c, self.eps_a) != (other.c, other.eps_a):
+            raise ValueError(f"cannot merge accumulators with different lens params: "
+                             f"(c={self.c}, eps_a={self.eps_a}) vs (c={other.c}, eps_a={other.eps_a})")
+        if self.summation != other.summation:
+            raise ValueError(f"cannot merge summation={other.summation!r} into summation={self.summation!r}")
+        self.count += other.count
+        if self.summation == "exact":
+            self._state[:] = [a + b for a, b in zip(self._state, other._state)]
+            self._refresh()
+        elif self.summation == "neumaier":
+            st = self._state
+            for k in (0, 2, 4):
+                st[k], st[k + 1] = _neumaier(st[k], st[k + 1], other._state[k])
+                st[k], st[k + 1] = _neumaier(st[k], st[k + 1], other._state[k + 1])
+            self._refresh()
+        else:
+            self.U_in  += other.U_in
+            self.V_out += other.V_out
+            self.W     += other.W
+        return self
+
+    def rsi(self, eps_w: float = EPS_W) -> float:
+        # RSI := tanh((V_out - U_in)/max(W, eps_w)); zero-evidence -> 0
+        if self.W <= 0:
+            return 0.0
+        return tanh((self.V_out - self.U_in) / max(self.W, eps_w))
+
+    def a_in(self, eps_w: float = EPS_W) -> float:
+        # pooled in-lane: tanh(U_in/max(W, eps_w))
+        return tanh(self.U_in / max(self.W, eps_w))
+
+    def a_out(self, eps_w: float = EPS_W) -> float:
+        # pooled out-lane: tanh(V_out/max(W, eps_w))
+        return tanh(self.V_out / max(self.W, eps_w))
+
+    def __repr__(self) -> str:
+        return (f"UWAccumulator(U_in={self.U_in!r}, V_out={self.V_out!r}, W={self.W!r}, count={self.count}, "
+                f"summation={self.summation!r})")
+
+# ---------- windowed U/W: sliding ring buffer and exponential decay ----------
+class SlidingUW:
+    # U/W over the last `span` seconds as a ring of `buckets` partial sums, bucket width := span/buckets.
+    # An event lands in bucket floor(ts/width); moving the head to a newer bucket expires the oldest ones
+    # by subtracting their partials from the running totals (O(1) per bucket, no raw items kept).
+    # Totals are re-summed from the live buckets (fsum) once per ring turn, so add/subtract rounding
+    # cannot drift; an empty window snaps back to exact zeros (zero-evidence RSI = 0).
+    # Window = the `buckets` newest buckets up to the head, i.e. (now - span, now] at bucket granularity;
+    # events older than that are counted in `late` and dropped.
+    __slots__ = ("span", "buckets", "width", "c", "eps_a", "u_max", "U_in", "V_out", "W", "count", "late",
+                 "head", "_ids", "_U", "_V", "_W", "_N", "_turn")
+
+    def __init__(self, span: float, buckets: int = 60, c: float = 1.0, eps_a: float = EPS_A):
+        if span <= 0 or buckets < 1:
+            raise ValueError(f"span must be > 0 and buckets >= 1, got {span}/{buckets}")
+        self.span, self.buckets, self.width = span, buckets, span / buckets
+        self.c, self.eps_a = c, eps_a
+        self.u_max = rapidity_max(eps_a)
+        self.U_in = self.V_out = self.W = 0.0
+        self.count = self.late = 0
+        self.head = None                      # absolute index of the newest bucket
+        self._ids = [0] * buckets             # absolute bucket index held by each ring slot
+        self._U, self._V, self._W = [0.0] * buckets, [0.0] * buckets, [0.0] * buckets
+        self._N = [0] * buckets
+        self._turn = 0
+
+    def _reset(self, k: int) -> None:
+        n = self.buckets
+        for j in range(k - n + 1, k + 1):
+            i = j % n
+            self._ids[i], self._U[i], self._V[i], self._W[i], self._N[i] = j, 0.0, 0.0, 0.0, 0
+        self.U_in = self.V_out = self.W = 0.0
+        self.count, self.head, self._turn = 0, k, 0
+
+    def _slide_to(self, k: int) -> None:
+        n = self.buckets
+        if self.head is None or k - self.head >= n:
+            return self._reset(k)
+        for j in range(self.head + 1, k + 1):
+            i = j % n
+            if self._N[i]:
+                self.U_in -= self._U[i]; self.V_out -= self._V[i]; self.W -= self._W[i]
+                self.count -= self._N[i]
+                self._U[i] = self._V[i] = self._W[i] = 0.0
+                self._N[i] = 0
+            self._ids[i] = j
+            self._turn += 1
+        self.head = k
+        if self.count == 0:
+            self.U_in = self.V_out = self.W = 0.0
+        elif self._turn >= n:
+            self.U_in, self.V_out, self.W = fsum(self._U), fsum(self._V), fsum(self._W)
+            self._turn = 0
+
+    def advance(self, now: float) -> "SlidingUW":
+        # move the window end to `now` (no-op if now is not past the head bucket)
+        k = floor(now / self.width)
+        if self.head is None or k > self.head:
+            self._slide_to(k)
+        return self
+
+    def add(self, ts: float, e_in: float, e_out: float, w: float) -> "SlidingUW":
+        k = floor(ts / self.width)
+        if self.head is None or k > self.head:
+            self._slide_to(k)
+        elif k <= self.head - self.buckets:
+            self.late += 1
+            return self
+        i = k % self.buckets
+        hi, c = self.u_max, self.c
+        u_in, u_out = -c * e_in, +c * e_out
+        du = w * (hi if u_in > hi else u_in if u_in > -hi else -hi)
+        dv = w * (hi if u_out > hi else u_out if u_out > -hi else -hi)
+        self._U[i] += du; self._V[i] += dv; self._W[i] += w; self._N[i] += 1
+        self.U_in += du; self.V_out += dv; self.W += w; self.count += 1
+        return self
+
+    def add_many(self, events: Iterable[Tuple[float, float, float, float]]) -> "SlidingUW":
+        # events: (ts, e_in, e_out, w)
+        for ts, e_in, e_out, w in events:
+            self.add(ts, e_in, e_out, w)
+        return self
+
+    def uvw(self, now: Optional[float] = None) -> Tuple[float, float, float]:
+        # (U_in, V_out, W) of the window ending at `now` (default: the newest event); choose_top_k input
+        if now is not None:
+            self.advance(now)
+        return self.U_in, self.V_out, self.W
+
+    def rsi(self, now: Optional[float] = None, eps_w: float = EPS_W) -> float:
+        # same argument order as DecayedUW.rsi(now, eps_w)
+        U_in, V_out, W = self.uvw(now)
+        if self.count == 0 or W <= 0:
+            return 0.0
+        return tanh((V_out - U_in) / max(W, eps_w))
+
+    def a_out(self, now: Optional[float] = None, eps_w: float = EPS_W) -> float:
+        U_in, V_out, W = self.uvw(now)
+        return tanh(V_out / max(W, eps_w))
+
+class DecayedUW:
+    # Exponentially decayed U/W: an event at ts weighs w*exp(-(now - ts)/tau) at read time, tau := half_life/ln 2.
+    # Forward decay: sums are held relative to a reference time t0 (an event adds w*u*exp((ts - t0)/tau)),
+    # so each update is O(1) with no per-event decay pass, and out-of-order events need no special case.
+    # Reading at `now` scales by exp(-(now - t0)/tau); t0 moves forward (sums rescaled) before the
+    # exponent gets near overflow. The decay cancels in (V_out - U_in)/W, so RSI depends on it only
+    # through the relative weights of events, eps_w and the zero-evidence rule.
+    __slots__ = ("half_life", "tau", "c", "eps_a", "u_max", "t0", "count", "_U", "_V", "_W")
+    RENORM = 256.0     # largest (ts - t0)/tau before rescaling; exp(256) ~ 1e111, far from overflow
+
+    def __init__(self, half_life: float, c: float = 1.0, eps_a: float = EPS_A):
+        if half_life <= 0:
+            raise ValueError(f"half_life must be > 0, got {half_life}")
+        self.half_life, self.tau = half_life, half_life / log(2.0)
+        self.c, self.eps_a = c, eps_a
+        self.u_max = rapidity_max(eps_a)
+        self.t0 = None
+        self.count = 0
+        self._U = self._V = self._W = 0.0
+
+    def _rebase(self, t: float) -> None:
+        f = exp(-(t - self.t0) / self.tau)
+        self._U *= f; self._V *= f; self._W *= f
+        self.t0 = t
+
+    def add(self, ts: float, e_in: float, e_out: float, w: float) -> "DecayedUW":
+        if self.t0 is None:
+            self.t0 = ts
+        x = (ts - self.t0) / self.tau
+        if x > self.RENORM:
+            self._rebase(ts)
+            x = 0.0
+        f = w * exp(x)
+        hi, c = self.u_max, self.c
+        u_in, u_out = -c * e_in, +c * e_out
+        self._U += f * (hi if u_in > hi else u_in if u_in > -hi else -hi)
+        self._V += f * (hi if u_out > hi else u_out if u_out > -hi else -hi)
+        self._W += f
+        self.count += 1
+        return self
+
+    def add_many(self, events: Iterable[Tuple[float, float, float, float]]) -> "DecayedUW":
+        # events: (ts, e_in, e_out, w)
+        for ts, e_in, e_out, w in events:
+            self.add(ts, e_in, e_out, w)
+        return self
+
+    def uvw(self, now: float) -> Tuple[float, float, float]:
+        # decayed (U_in, V_out, W) as of `now`
+        if self.t0 is None:
+            return 0.0, 0.0, 0.0
+        if (now - self.t0) / self.tau > self.RENORM:
+            self._rebase(now)
+        f = exp(-(now - self.t0) / self.tau)
+        return self._U * f, self._V * f, self._W * f
+
+    def rsi(self, now: float, eps_w: float = EPS_W) -> float:
+        U_in, V_out, W = self.uvw(now)
+        if self.count == 0 or W <= 0:
+            return 0.0
+        return tanh((V_out - U_in) / max(W, eps_w))
+
+    def a_out(self, now: float, eps_w: float = EPS_W) -> float:
+        U_in, V_out, W = self.uvw(now)
+        return tanh(V_out / max(W, eps_w))
 
 # ---------- calm gate (alignment-only) ----------
+GATE_MODES = ("mul", "u_scale")    # "mul" -> g_t*RSI; apply_gate treats any other mode as "u_scale"
+
 def apply_gate(RSI: float, g_t: float, mode: str = "mul", eps_a: float = EPS_A) -> float:
     # RSI_env := g_t * RSI     or     RSI_env := tanh( g_t * atanh(RSI) )
     x = clamp_align(RSI, eps_a)
     y = g_t * x if mode == "mul" else tanh(g_t * atanh(x))
     return clamp_align(y, eps_a)
 
+# ---------- top-k chooser (u-space) ----------
+def _candidate_uvw(cand, eps_a: float, c: float = 1.0) -> Tuple[float, float, float]:
+    # UWAccumulator | (U_in, V_out, W) | item group [(e_in, e_out, w), ...] (lens gain c applies to groups)
+    if isinstance(cand, UWAccumulator):
+        return cand.U_in, cand.V_out, cand.W
+    if len(cand) == 3 and isinstance(cand[0], (int, float)):
+        return cand[0], cand[1], cand[2]
+    acc = UWAccumulator(c=c, eps_a=eps_a).add_many(cand)
+    return acc.U_in, acc.V_out, acc.W
+
+def choose_top_k(candidates: Iterable, k: int = 1, g_t: float = 1.0, mode: str = "mul",
+                 eps_w: float = EPS_W, eps_a: float = EPS_A, c: float = 1.0) -> List[Tuple[int, float]]:
+    # Top-k candidates by RSI_env, best first, as [(index, RSI_env)]; ties -> lower index first
+    # c = lens gain for item-group candidates, as in rsi_from_items
+    # Ranks in u-space: z := clip((V_out - U_in)/max(W, eps_w), -u_max, u_max), the rapidity of the
+    # clamped RSI; RSI_env is monotone in z (direction = sign(g_t)) for both gate modes, so a size-k
+    # heap picks the winners and tanh/apply_gate run only for them
+    u_max = rapidity_max(eps_a)
+    sgn = (g_t > 0) - (g_t < 0)
+    def keyed():
+        for i, cand in enumerate(candidates):
+            U_in, V_out, W = _candidate_uvw(cand, eps_a, c)
+            z = 0.0 if W <= 0 else min(u_max, max(-u_max, (V_out - U_in) / max(W, eps_w)))
+            yield (sgn * z, -i)
+    top = heapq.nlargest(k, keyed())
+    return [(-neg_i, apply_gate(tanh(sgn * key) if sgn else 0.0, g_t, mode, eps_a)) for key, neg_i in top]
+
+# ---------- bands from rapidity (tanh-free) ----------
+Z_SAT = 20.0    # |z| beyond which float64 tanh(z) is exactly +-1; edge search range
+
+def _past(x: float, t: float) -> bool:
+    # band_of edge rule: x >= t moves up for t >= 0, x > t for t < 0 (an edge value goes away from zero)
+    return x >= t if t >= 0 else x > t
+
+def _first_true(pred, lo: float, hi: float) -> float:
+    # smallest float z in (lo, hi] with pred(z), for pred monotone with pred(lo) false and pred(hi) true
+    while True:
+        mid = lo + (hi - lo) / 2
+        if mid == lo or mid == hi:
+            return hi
+        if pred(mid):
+            hi = mid
+        else:
+            lo = mid
+
+class RapidityBands:
+    # Band of apply_gate(tanh(z), g_t, mode) straight from the rapidity z := (V_out - U_in)/max(W, eps_w)
+    # (0 for zero evidence; the u-space key of choose_top_k): one bisect per decision, no tanh/atanh/gate.
+    # Each threshold t is mapped once into z-space by bisection over the float64 grid of the exact path,
+    # so the edge table is exact, not fitted. z whose exact RSI_env lies within +-margin of a threshold
+    # (a guard interval around each edge) is re-classified by exact(); code(z) == exact(z) for every z,
+    # and the table alone is exact for any value more than `margin` from a threshold.
+    # Thresholds follow band_of (default BANDS) or a manifest {label: lower edge}; codes 0.. = low..high.
+    __slots__ = ("labels", "thresholds", "g_t", "mode", "eps_a", "margin", "sgn", "edges", "guard")
+
+    def __init__(self, bands: Optional[Dict[str, float]] = None, g_t: float = 1.0, mode: str = "mul",
+                 eps_a: float = EPS_A, margin: float = 1e-9):
+        if mode not in GATE_MODES:
+            raise ValueError(f"mode must be one of {GATE_MODES}, got {mode!r}")
+        if margin < 0:
+            raise ValueError(f"margin must be >= 0, got {margin}")
+        ordered = sorted((BANDS if bands is None else bands).items(), key=lambda kv: kv[1])
+        self.labels = tuple(k for k, _ in ordered)
+        self.thresholds = tuple(t for _, t in ordered[1:])
+        self.g_t, self.mode, self.eps_a, self.margin = g_t, mode, eps_a, margin
+        self.sgn = -1.0 if g_t < 0 else 1.0          # RSI_env is monotone in z, decreasing for g_t < 0
+        self.edges = [self._edge(t, t) for t in self.thresholds]
+        guard: List[float] = []
+        for t in self.thresholds:
+            lo, hi = self._edge(t - margin, t), self._edge(t + margin, t)
+            if guard and lo <= guard[-1]:
+                guard[-1] = max(guard[-1], hi)     # merge overlapping guard intervals
+            elif lo < hi:
+                guard += [lo, hi]
+        self.guard = guard
+
+    def _edge(self, t: float, like: float) -> float:
+        # smallest sgn*z at which the exact RSI_env passes t, using the edge rule of threshold `like`;
+        # -inf / +inf if it always / never does
+        g_t, mode, eps_a, sgn = self.g_t, self.mode, self.eps_a, self.sgn
+        if like >= 0:
+            pred = lambda zz: apply_gate(tanh(sgn * zz), g_t, mode, eps_a) >= t
+        else:
+            pred = lambda zz: apply_gate(tanh(sgn * zz), g_t, mode, eps_a) > t
+        if pred(-Z_SAT):
+            return float("-inf")
+        if not pred(Z_SAT):
+            return float("inf")
+        return _first_true(pred, -Z_SAT, Z_SAT)
+
+    def exact(self, z: float) -> int:
+        # reference path: code of apply_gate(tanh(z))
+        x = apply_gate(tanh(z), self.g_t, self.mode, self.eps_a)
+        return sum(_past(x, t) for t in self.thresholds)
+
+    def code(self, z: float) -> int:
+        zz = self.sgn * z
+        if bisect_right(self.guard, zz) & 1:
+            return self.exact(z)
+        return bisect_right(self.edges, zz)
+
+    def label(self, z: float) -> str:
+        return self.labels[self.code(z)]
+
 # ---------- demo: beam pick ----------
 def demo_beam():
     # Two candidates with simple lens items (e_in, e_out, w); weights can be |m|^gamma or 1
@@ -58,7 +483,7 @@ def demo_beam():
     g_t = 0.81                                        # example calm gate
     RSI_A = rsi_from_items(candA); RSI_B = rsi_from_items(candB)
     RSIe_A = apply_gate(RSI_A, g_t, mode="mul"); RSIe_B = apply_gate(RSI_B, g_t, mode="mul")
-    pick = "A" if RSIe_A >= RSIe_B else "B"
+    pick = "AB"[choose_top_k([candA, candB], k=1, g_t=g_t, mode="mul")[0][0]]
     print(f"RSI_A={RSI_A:.6f}, RSIe_A={RSIe_A:.6f}, band_A={band_of(RSIe_A)}")
     print(f"RSI_B={RSI_B:.6f}, RSIe_B={RSIe_B:.6f}, band_B={band_of(RSIe_B)}")
     print(f"PICK={pick} by RSI_env; classical m unchanged via phi((m,a)) = m")
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# Local HTTP scoring service (stdlib; vectorized through ssm_ai_batch when NumPy is installed)
+# Concurrent requests are coalesced into micro-batches: the first queued request opens a batch, which
+# closes at max_batch candidates or after max_wait, and one kernel call scores every candidate in it.
+#
+#   POST /score   {"candidates": [c, ...], "g_t": 1.0, "mode": "mul"}
+#                 c := [[e_in, e_out, w], ...]  (item group)  or  {"U_in": .., "V_out": .., "W": ..}
+#              -> {"results": [{"RSI": .., "RSI_env": .., "band": ..}, ...]}   (same order as candidates)
+#   GET  /health -> {"ok": true, "kernel": "numpy" | "python", "batches": n, "requests": n, "candidates": n}
+#
+# Usage:
+#   python ssm_ai_serve.py --port 8765 --max-batch 4096 --max-wait-ms 1
+#   curl -s localhost:8765/score -d '{"candidates": [[[0.2, 0.5, 1.0]], [[0.3, 0.4, 1.0]]], "g_t": 0.81}'
+# HTTP/1.1 keep-alive is on, so a client that reuses its connection pays no per-call connect cost.
+
+import argparse
+import json
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from math import tanh
+from typing import List, Optional, Tuple
+
+from ssm_ai_quickstart import EPS_A, EPS_W, GATE_MODES, UWAccumulator, apply_gate, band_of
+
+try:
+    import numpy as np
+    from ssm_ai_batch import band_codes, band_labels, pack_groups, rsi_from_uvw, uvw_batch
+except ImportError:      # no NumPy: same answers through the scalar path, one candidate at a time
+    np = None
+
+MAX_BODY = 64 << 20                # bytes per request
+
+class _Request:
+    __slots__ = ("cands", "g_t", "soft", "done", "results", "error")
+
+    def __init__(self, cands: list, g_t: float, soft: bool):
+        self.cands, self.g_t, self.soft = cands, g_t, soft
+        self.done = threading.Event()
+        self.results: Optional[List[dict]] = None
+        self.error: Optional[BaseException] = None
+
+def parse_request(body: bytes) -> _Request:
+    # Validate a /score body up front, so a malformed request fails alone instead of inside a shared batch
+    req = json.loads(body)
+    if not isinstance(req, dict) or not isinstance(req.get("candidates"), list):
+        raise ValueError('body must be {"candidates": [...], "g_t": float, "mode": "mul"|"u_scale"}')
+    mode = req.get("mode", "mul")
+    if mode not in GATE_MODES:
+        raise ValueError(f"mode must be one of {GATE_MODES}, got {mode!r}")
+    cands = []
+    for c in req["candidates"]:
+        if isinstance(c, dict):
+            cands.append((float(c["U_in"]), float(c["V_out"]), float(c["W"])))
+        elif isinstance(c, list):
+            cands.append([(float(e_in), float(e_out), float(w)) for e_in, e_out, w in c])
+        else:
+            raise ValueError("each candidate is an item list [[e_in, e_out, w], ...] or {U_in, V_out, W}")
+    return _Request(cands, float(req.get("g_t", 1.0)), mode != "mul")
+
+# ---------- kernels: one call per micro-batch ----------
+def _score_numpy(batch: List[_Request], eps_w: float, eps_a: float, c: float) -> None:
+    groups: List[list] = []
+    slots: List[Tuple[int, int]] = []           # (candidate index, group index) for item-group candidates
+    U, V, W, g, soft = [], [], [], [], []
+    for r in batch:
+        for cand in r.cands:
+            if isinstance(cand, tuple):
+                U.append(cand[0]); V.append(cand[1]); W.append(cand[2])
+            else:
+                slots.append((len(U), len(groups)))
+                groups.append(cand)
+                U.append(0.0); V.append(0.0); W.append(0.0)
+            g.append(r.g_t)
+            soft.append(r.soft)
+    U, V, W = np.array(U), np.array(V), np.array(W)
+    if groups:
+        e_in, e_out, w, offsets = pack_groups(groups)
+        gU, gV, gW = uvw_batch(e_in, e_out, w, offsets=offsets, c=c, eps_a=eps_a)
+        at = np.array([i for i, _ in slots], dtype=np.int64)
+        U[at], V[at], W[at] = gU, gV, gW
+    rsi = rsi_from_uvw(U, V, W, eps_w)
+    lo, hi = -1.0 + eps_a, 1.0 - eps_a
+    g, soft = np.array(g), np.array(soft)
+    x = np.clip(rsi, lo, hi)
+    y = g * x
+    if soft.any():
+        y[soft] = np.tanh(g[soft] * np.arctanh(x[soft]))
+    env = np.clip(y, lo, hi)
+    rsi_l, env_l, band_l = rsi.tolist(), env.tolist(), band_labels(band_codes(env)).tolist()
+    k = 0
+    for r in batch:
+        n = len(r.cands)
+        r.results = [{"RSI": a, "RSI_env": b, "band": c}
+                     for a, b, c in zip(rsi_l[k:k + n], env_l[k:k + n], band_l[k:k + n])]
+        k += n
+
+def _score_python(batch: List[_Request], eps_w: float, eps_a: float, c: float) -> None:
+    for r in batch:
+        out = []
+        mode = "u_scale" if r.soft else "mul"
+        for cand in r.cands:
+            if isinstance(cand, tuple):
+                U_in, V_out, W = cand
+                rsi = 0.0 if W <= 0 else tanh((V_out - U_in) / max(W, eps_w))
+            else:
+                rsi = UWAccumulator(c=c, eps_a=eps_a).add_many(cand).rsi(eps_w)
+            env = apply_gate(rsi, r.g_t, mode, eps_a)
+            out.append({"RSI": rsi, "RSI_env": env, "band": band_of(env)})
+        r.results = out
+
+# ---------- micro-batcher ----------
+class MicroBatcher:
+    # Single scoring thread fed by a queue. A batch opens on the first request and closes when it holds
+    # max_batch candidates or max_wait seconds have passed, whichever comes first; a single request
+    # larger than max_batch is scored on its own. Callers block in submit() until their slice is ready.
+    # c = lens gain applied to item-group candidates (rsi_from_items(items, c=c)).
+
+    def __init__(self, max_batch: int = 4096, max_wait: float = 0.001, eps_w: float = EPS_W,
+                 eps_a: float = EPS_A, kernel: Optional[str] = None, c: float = 1.0):
+        if max_batch < 1 or max_wait < 0:
+            raise ValueError("max_batch must be >= 1 and max_wait >= 0")
+        self.max_batch, self.max_wait = max_batch, max_wait
+        self.eps_w, self.eps_a, self.c = eps_w, eps_a, c
+        self.kernel = kernel or ("numpy" if np is not None else "python")
+        if self.kernel == "numpy" and np is None:
+            raise ValueError("kernel 'numpy' needs NumPy installed")
+        self._score = _score_numpy if self.kernel == "numpy" else _score_python
+        self.stats = {"batches": 0, "requests": 0, "candidates": 0}
+        self._q: "queue.Queue[_Request]" = queue.Queue()
+        threading.Thread(target=self._run, name="ssm-ai-batcher", daemon=True).start()
+
+    def submit(self, req: _Request) -> List[dict]:
+        self._q.put(req)
+        req.done.wait()
+        if req.error is not None:
+            raise req.error
+        return req.results
+
+    def _run(self) -> None:
+        q, clock = self._q, time.monotonic
+        while True:
+            batch = [q.get()]
+            n = len(batch[0].cands)
+            deadline = clock() + self.max_wait
+            while n < self.max_batch:
+                try:
+                    r = q.get_nowait()
+                except queue.Empty:
+                    left = deadline - clock()
+                    if left <= 0:
+                        break
+                    try:
+                        r = q.get(timeout=left)
+                    except queue.Empty:
+                        break
+                batch.append(r)
+                n += len(r.cands)
+            try:
+                self._score(batch, self.eps_w, self.eps_a, self.c)
+            except Exception as e:          # scoring bug: fail this batch's callers, keep serving
+                for r in batch:
+                    r.error = e
+            finally:
+                self.stats["batches"] += 1
+                self.stats["requests"] += len(batch)
+                self.stats["candidates"] += n
+                for r in batch:
+                    r.done.set()
+
+# ---------- HTTP ----------
+class ScoreHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"      # keep-alive
+    disable_nagle_algorithm = True     # TCP_NODELAY: small replies must not wait for a delayed ACK
+    server_version = "ssm-ai-serve"
+
+    def _send(self, code: int, obj) -> None:
+        body = json.dumps(obj, separators=(",", ":")).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        if self.path != "/health":
+            return self._send(404, {"error": f"no route {self.path}"})
+        b = self.server.batcher
+        self._send(200, dict(ok=True, kernel=b.kernel, **b.stats))
+
+    def do_POST(self) -> None:
+        if self.path != "/score":
+            return self._send(404, {"error": f"no route {self.path}"})
+        n = int(self.headers.get("Content-Length") or 0)
+        if n > MAX_BODY:
+            self.close_connection = True
+            return self._send(413, {"error": f"body larger than {MAX_BODY} bytes"})
+        try:
+            req = parse_request(self.rfile.read(n))
+        except (ValueError, KeyError, TypeError) as e:
+            return self._send(400, {"error": str(e)})
+        try:
+            self._send(200, {"results": self.server.batcher.submit(req)})
+        except Exception as e:
+            self._send(500, {"error": f"{type(e).__name__}: {e}"})
+
+    def log_message(self, fmt, *args) -> None:
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+def make_server(host: str = "127.0.0.1", port: int = 8765, batcher: Optional[MicroBatcher] = None,
+                verbose: bool = False) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), ScoreHandler)
+    server.daemon_threads = True
+    server.batcher = batcher or MicroBatcher()
+    server.verbose = verbose
+    return server
+
+def main():
+    ap = argparse.ArgumentParser(description="Micro-batching SSM-AI scoring service (RSI, gate, band).")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--max-batch", type=int, default=4096, help="Candidates per micro-batch")
+    ap.add_argument("--max-wait-ms", type=float, default=1.0, help="Longest a batch stays open (ms)")
+    ap.add_argument("--eps-w", type=float, default=EPS_W)
+    ap.add_argument("--eps-a", type=float, default=EPS_A)
+    ap.add_argument("--c", type=float, default=1.0, help="Lens gain for item-group candidates (see tune_c)")
+    ap.add_argument("--kernel", choices=("numpy", "python"), default=None, help="Default: numpy if installed")
+    ap.add_argument("--verbose", action="store_true", help="Log every request")
+    args = ap.parse_args()
+    batcher = MicroBatcher(args.max_batch, args.max_wait_ms / 1000.0, args.eps_w, args.eps_a, args.kernel, args.c)
+    server = make_server(args.host, args.port, batcher, args.verbose)
+    print(f"ssm-ai-serve on http://{args.host}:{server.server_port} kernel={batcher.kernel} "
+          f"max_batch={args.max_batch} max_wait_ms={args.max_wait_ms}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
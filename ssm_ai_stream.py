@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+# Streaming decision-event ingestion (stdlib asyncio): socket / named pipe / stdin -> windowed U/W -> summaries
+# Events (m, e_in, e_out, w, g_t) fold into one running UWAccumulator per (svc, tumbling window); a timer
+# flushes RSI / RSI_env / band per closed window, so drift shows up one window after it happens instead
+# of after an offline batch run. Windows close on event time (highest ts seen - lateness), never on the
+# wall clock, so a backlog replayed faster than real time loses nothing.
+#
+# Framing (--framing):
+#   lines  one record per line
+#   lp     4-byte big-endian payload length, then the payload (Kafka/MQTT-style frames)
+# Record payload: JSON {"svc", "m", "e_in", "e_out", "w", "g_t", "ts"?} or CSV  svc,m,e_in,e_out,w,g_t[,ts]
+#   ts = event time in epoch seconds (wall-clock arrival time if missing); g_t defaults to 1.0
+#
+# Usage:
+#   python ssm_ai_stream.py --unix /tmp/ssm.sock --window 10 --flush-every 1
+#   python ssm_ai_stream.py --fifo /tmp/ssm.pipe --framing lp --log logs/stream
+#   cat events.csv | python ssm_ai_stream.py --stdin --window 60
+
+import argparse
+import asyncio
+import json
+import os
+import stat
+import struct
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ssm_ai_quickstart import EPS_A, EPS_W, GATE_MODES, SUMMATION_MODES, UWAccumulator, apply_gate, band_of
+
+FRAMINGS = ("lines", "lp")
+MAX_FRAME = 1 << 20      # bytes; a larger length prefix means a broken stream
+_LEN = struct.Struct(">I")
+
+# ---------- windowed accumulators ----------
+class WindowedUW:
+    # Running U/W per (svc, window index), window index := floor(ts / window).
+    # Each key owns one UWAccumulator plus [g_t last seen, m sum]; an event is folded in place
+    # (naive summation: the UWAccumulator.add_many arithmetic inlined, no per-event objects).
+    # Event-time watermark: a window closes once the highest ts seen >= window end + lateness; from then
+    # on its events count as late, whether or not the timer has flushed it yet (output never depends on
+    # flush timing).
+
+    def __init__(self, window: float = 60.0, lateness: float = 0.0, c: float = 1.0, eps_w: float = EPS_W,
+                 eps_a: float = EPS_A, gate_mode: str = "mul", summation: str = "naive"):
+        if window <= 0 or lateness < 0:
+            raise ValueError("window must be > 0 and lateness >= 0")
+        if gate_mode not in GATE_MODES:
+            raise ValueError(f"gate_mode must be one of {GATE_MODES}, got {gate_mode!r}")
+        if summation not in SUMMATION_MODES:
+            raise ValueError(f"summation must be one of {SUMMATION_MODES}, got {summation!r}")
+        self.window, self.lateness = window, lateness
+        self.c, self.eps_w, self.eps_a = c, eps_w, eps_a
+        self.gate_mode, self.summation = gate_mode, summation
+        self.state: Dict[Tuple[str, int], list] = {}      # key -> [acc, g_t, m_sum]
+        self.watermark = -1                               # highest window index already flushed
+        self.max_ts = float("-inf")                       # highest event time seen
+        self.closed = float("-inf")                       # highest window index closed by event time
+        self.events = self.late = self.bad = 0
+
+    def add(self, svc: str, ts: float, m: float, e_in: float, e_out: float, w: float, g_t: float) -> None:
+        k = int(ts // self.window)
+        if ts > self.max_ts:
+            self.max_ts = ts
+            self.closed = (ts - self.lateness) // self.window - 1
+        if k <= self.closed or k <= self.watermark:
+            self.late += 1
+            return
+        st = self.state.get((svc, k))
+        if st is None:
+            st = self.state[(svc, k)] = [UWAccumulator(self.c, self.eps_a, self.summation), g_t, 0.0]
+        acc = st[0]
+        if acc.summation == "naive":
+            hi = acc.u_max
+            u_in, u_out = -acc.c * e_in, acc.c * e_out
+            acc.U_in  += w * (hi if u_in > hi else u_in if u_in > -hi else -hi)
+            acc.V_out += w * (hi if u_out > hi else u_out if u_out > -hi else -hi)
+            acc.W     += w
+            acc.count += 1
+        else:
+            acc.add(e_in, e_out, w)
+        st[1] = g_t
+        st[2] += m
+        self.events += 1
+
+    def summary(self, svc: str, k: int, st: list) -> dict:
+        acc, g_t, m_sum = st
+        rsi = acc.rsi(self.eps_w)
+        env = apply_gate(rsi, g_t, self.gate_mode, self.eps_a)
+        return {"svc": svc, "window_start": k * self.window, "window_end": (k + 1) * self.window,
+                "count": acc.count, "m": m_sum / acc.count if acc.count else 0.0,
+                "U_in": acc.U_in, "V_out": acc.V_out, "W": acc.W, "a": acc.a_out(self.eps_w),
+                "RSI": rsi, "g_t": g_t, "RSI_env": env, "band": band_of(env)}
+
+    def flush(self, final: bool = False) -> List[dict]:
+        # Summaries of every window closed by the event-time watermark (all windows when final), oldest first
+        limit = float("inf") if final else self.closed
+        done = sorted((k, svc) for svc, k in self.state if k <= limit)
+        out = [self.summary(svc, k, self.state.pop((svc, k))) for k, svc in done]
+        if done:
+            self.watermark = max(self.watermark, done[-1][0])
+        return out
+
+# ---------- record parsing ----------
+def parse_record(payload: str, now: float) -> Tuple[str, float, float, float, float, float, float]:
+    # JSON object or CSV  svc,m,e_in,e_out,w,g_t[,ts]  ->  (svc, ts, m, e_in, e_out, w, g_t)
+    if payload[:1] == "{":
+        r = json.loads(payload)
+        return (str(r["svc"]), float(r.get("ts", now)), float(r.get("m", 0.0)), float(r["e_in"]),
+                float(r["e_out"]), float(r["w"]), float(r.get("g_t", 1.0)))
+    f = payload.split(",")
+    if len(f) not in (6, 7):
+        raise ValueError(f"expected svc,m,e_in,e_out,w,g_t[,ts], got {len(f)} fields")
+    return (f[0], float(f[6]) if len(f) == 7 else now, float(f[1]), float(f[2]), float(f[3]),
+            float(f[4]), float(f[5]))
+
+# ---------- pipeline stage ----------
+class StreamStage:
+    # Readers (one per connection / pipe) parse records into `agg`; a timer task emits flushed summaries
+    # to `sink` every flush_every seconds. Bad records are counted and skipped, never fatal.
+    # `clock` only stamps records that carry no ts; window closing follows event time (WindowedUW).
+
+    def __init__(self, agg: WindowedUW, sink: Callable[[dict], None], framing: str = "lines",
+                 flush_every: float = 1.0, clock: Callable[[], float] = time.time):
+        if framing not in FRAMINGS:
+            raise ValueError(f"framing must be one of {FRAMINGS}, got {framing!r}")
+        self.agg, self.sink, self.framing = agg, sink, framing
+        self.flush_every, self.clock = flush_every, clock
+
+    def _handle(self, payload: bytes) -> None:
+        try:
+            self.agg.add(*parse_record(payload.decode("utf-8").strip(), self.clock()))
+        except (ValueError, KeyError, TypeError, UnicodeDecodeError):
+            self.agg.bad += 1
+
+    async def consume(self, reader: asyncio.StreamReader) -> None:
+        handle = self._handle
+        if self.framing == "lines":
+            async for line in reader:
+                if line.strip():
+                    handle(line)
+            return
+        while True:
+            try:
+                head = await reader.readexactly(_LEN.size)
+            except asyncio.IncompleteReadError:
+                return
+            n = _LEN.unpack(head)[0]
+            if n > MAX_FRAME:
+                raise ValueError(f"frame of {n} bytes exceeds MAX_FRAME; stream out of sync")
+            try:
+                handle(await reader.readexactly(n))
+            except asyncio.IncompleteReadError:
+                return
+
+    async def consume_file(self, f, block: int = 1 << 20) -> None:
+        # Regular file (not pollable): parse it block by block, so memory stays at one block however
+        # large the file; the timer's emit() runs between blocks once flush_every has elapsed.
+        handle, lines = self._handle, self.framing == "lines"
+        due = time.monotonic() + self.flush_every
+        buf = b""
+        for data in iter(lambda: f.read(block), b""):
+            buf += data
+            if lines:
+                *records, buf = buf.split(b"\n")
+                for line in records:
+                    if line.strip():
+                        handle(line)
+            else:
+                i = 0
+                while len(buf) - i >= _LEN.size:
+                    n = _LEN.unpack_from(buf, i)[0]
+                    if n > MAX_FRAME:
+                        raise ValueError(f"frame of {n} bytes exceeds MAX_FRAME; stream out of sync")
+                    if len(buf) - i - _LEN.size < n:
+                        break
+                    handle(buf[i + _LEN.size:i + _LEN.size + n])
+                    i += _LEN.size + n
+                buf = buf[i:]
+            if time.monotonic() >= due:
+                self.emit()
+                due = time.monotonic() + self.flush_every
+            await asyncio.sleep(0)
+        if lines and buf.strip():
+            handle(buf)
+
+    async def _on_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            await self.consume(reader)
+        except ValueError as e:
+            print(f"[WARN] dropping connection: {e}", file=sys.stderr)
+        finally:
+            writer.close()
+
+    def emit(self, final: bool = False) -> int:
+        rows = self.agg.flush(final)
+        for row in rows:
+            self.sink(row)
+        return len(rows)
+
+    async def _timer(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_every)
+            self.emit()
+
+    async def serve_socket(self, unix: Optional[str] = None, host: str = "127.0.0.1",
+                           port: Optional[int] = None) -> None:
+        # Listen until cancelled; every connection is one event stream
+        if unix:
+            if os.path.exists(unix):
+                os.unlink(unix)
+            server = await asyncio.start_unix_server(self._on_client, path=unix)
+        else:
+            server = await asyncio.start_server(self._on_client, host, port)
+        timer = asyncio.ensure_future(self._timer())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            timer.cancel()
+            self.emit(final=True)
+
+    async def serve_pipe(self, path: Optional[str] = None) -> None:
+        # Read one pipe (a FIFO path, or stdin when path is None) to EOF, then flush everything
+        loop = asyncio.get_running_loop()
+        f = open(path, "rb", buffering=0) if path else sys.stdin.buffer
+        if stat.S_ISREG(os.fstat(f.fileno()).st_mode):     # redirected file: not pollable
+            try:
+                await self.consume_file(f)
+            finally:
+                self.emit(final=True)
+            return
+        reader = asyncio.StreamReader(limit=MAX_FRAME)
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), f)
+        timer = asyncio.ensure_future(self._timer())
+        try:
+            await self.consume(reader)
+        finally:
+            timer.cancel()
+            self.emit(final=True)
+
+# ---------- sinks ----------
+def ndjson_sink(out=sys.stdout) -> Callable[[dict], None]:
+    def sink(row: dict) -> None:
+        out.write(json.dumps(row, separators=(",", ":")) + "\n")
+        out.flush()
+    return sink
+
+def log_sink(writer, knobs_hash: str = "stream") -> Callable[[dict], None]:
+    # Summaries as DecisionLogWriter rows (one per svc/window; a/U/W are the a_out/V_out/W of the window)
+    def sink(row: dict) -> None:
+        writer.write({"iso_utc": datetime.fromtimestamp(row["window_end"], tz=timezone.utc), "svc": row["svc"],
+                      "knobs_hash": knobs_hash, "m": row["m"], "a": row["a"], "U": row["V_out"], "W": row["W"],
+                      "RSI": row["RSI"], "g_t": row["g_t"], "RSI_env": row["RSI_env"], "band": row["band"],
+                      "note": f"window={row['window_end'] - row['window_start']:g}s n={row['count']}"})
+        writer.flush()
+    return sink
+
+def main():
+    ap = argparse.ArgumentParser(description="Stream decision events into windowed U/W accumulators.")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--unix", help="Listen on this Unix socket path")
+    src.add_argument("--tcp", help="Listen on host:port")
+    src.add_argument("--fifo", help="Read a named pipe to EOF")
+    src.add_argument("--stdin", action="store_true", help="Read STDIN to EOF")
+    ap.add_argument("--framing", choices=FRAMINGS, default="lines")
+    ap.add_argument("--window", type=float, default=60.0, help="Tumbling window length (s)")
+    ap.add_argument("--lateness", type=float, default=0.0, help="Keep a window open this long after its end (s)")
+    ap.add_argument("--flush-every", type=float, default=1.0, help="Summary timer period (s)")
+    ap.add_argument("--gate-mode", choices=GATE_MODES, default="mul", help="apply_gate mode")
+    ap.add_argument("--summation", choices=SUMMATION_MODES, default="naive", help="UWAccumulator summation mode")
+    ap.add_argument("--c", type=float, default=1.0, help="Lens gain (see ssm_ai_calibrate.tune_c)")
+    ap.add_argument("--log", help="Also write summaries to a DecisionLogWriter base path (binary .ssmlog)")
+    args = ap.parse_args()
+
+    agg = WindowedUW(args.window, args.lateness, c=args.c, gate_mode=args.gate_mode, summation=args.summation)
+    sinks = [ndjson_sink()]
+    writer = None
+    if args.log:
+        from ssm_ai_log import DecisionLogWriter
+        writer = DecisionLogWriter(args.log)
+        sinks.append(log_sink(writer))
+    stage = StreamStage(agg, lambda row: [s(row) for s in sinks], args.framing, args.flush_every)
+    if args.unix or args.tcp:
+        host, _, port = (args.tcp or "").rpartition(":")
+        run = stage.serve_socket(args.unix, host or "127.0.0.1", int(port) if port else None)
+    else:
+        run = stage.serve_pipe(args.fifo)
+    try:
+        asyncio.run(run)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if writer is not None:
+            writer.close()
+        print(f"events={agg.events} late={agg.late} bad={agg.bad}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
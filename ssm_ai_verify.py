@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 # Golden vectors + invariance checks (prints PASS/FAIL). Use float64 Python math.
 
+import struct
 from math import tanh, atanh, isfinite
 
 EPS_A = 1e-6
@@ -12,6 +13,24 @@ def clamp_align(a, eps_a=EPS_A):
 def approx(x, y, tol=1e-12):
     return abs(x - y) <= tol
 
+def _numpy():
+    # NumPy for the batch-path checks; None without it (those checks print SKIP)
+    try:
+        import numpy
+        return numpy
+    except ImportError:
+        return None
+
+def next_float(x, toward):
+    # math.nextafter (Python 3.9+) via the int64 bit pattern, so the golden run stays 3.8-compatible
+    if x == toward:
+        return x
+    if x == 0.0:
+        return 5e-324 if toward > 0 else -5e-324
+    i = struct.unpack("<q", struct.pack("<d", x))[0]
+    i += 1 if (x < toward) == (x > 0) else -1
+    return struct.unpack("<d", struct.pack("<q", i))[0]
+
 def test_clamp_roundtrip():
     a_in = 0.9999999
     a_c  = clamp_align(a_in)
@@ -36,18 +55,772 @@ def test_chooser():
     RSI = tanh((V_out - U_in) / max(W, EPS_W))
     return approx(RSI, 0.604368, 1e-6)
 
+def test_top_k():
+    # choose_top_k == full sort by (RSI_env desc, index asc): ties -> lower index, g_t < 0, both gate modes
+    from ssm_ai_quickstart import UWAccumulator, apply_gate, band_of, choose_top_k
+    groups = [[((k * 0.37) % 1.2 - 0.6, (k * 0.53) % 1.4 - 0.7, 1.0 + k % 3)] for k in range(12)]
+    cands = groups + [(-0.2, 0.5, 1.0), (-0.2, 0.5, 1.0), (0.0, 0.0, 0.0), UWAccumulator().add_many(groups[3])]
+    rsi = []
+    for cd in cands:                                # item group | accumulator | (U_in, V_out, W)
+        if isinstance(cd, list):
+            cd = UWAccumulator().add_many(cd)
+        U_in, V_out, W = (cd.U_in, cd.V_out, cd.W) if isinstance(cd, UWAccumulator) else cd
+        rsi.append(0.0 if W <= 0 else tanh((V_out - U_in) / max(W, EPS_W)))
+    ok = True
+    for g_t, mode in ((0.81, "mul"), (-0.5, "mul"), (0.81, "u_scale"), (-1.3, "u_scale"), (0.0, "mul")):
+        env = [apply_gate(r, g_t, mode) for r in rsi]
+        order = sorted(range(len(cands)), key=lambda i: (-env[i], i))
+        for k in (1, 5, len(cands)):
+            top = choose_top_k(cands, k=k, g_t=g_t, mode=mode)
+            ok = ok and [i for i, _ in top] == order[:k]
+            ok = ok and all(approx(x, env[i]) and band_of(x) == band_of(env[i]) for i, x in top)
+    return ok
+
+def test_rapidity_fastpath():
+    # u-space clip vs tanh->clamp->atanh round trip: bit-identical when clamped, else <= 2^-51/(1-a^2)
+    from ssm_ai_quickstart import map_to_rapidity, map_to_alignment
+    ok = True
+    for k in range(-2000, 2001):
+        e = k / 200.0                                  # sweeps past the clamp edge u_max ~ 7.2543
+        u_in, u_out = map_to_rapidity(e, e)
+        a_in, a_out = map_to_alignment(e, e)
+        for u, a in ((u_in, a_in), (u_out, a_out)):
+            bound = 2.0 ** -51 / (1.0 - a * a)
+            ok = ok and isfinite(u) and abs(u - atanh(a)) <= bound
+    return ok
+
+def test_rapidity_bands():
+    # tanh-free band kernel == band_of(apply_gate(tanh(z))) for every z; table alone exact beyond the margin
+    from bisect import bisect_right
+    from ssm_ai_quickstart import RapidityBands, apply_gate, band_of
+    ok = True
+    for g_t, mode in ((0.81, "mul"), (1.0, "mul"), (-0.5, "mul"), (0.81, "u_scale"), (-2.0, "u_scale")):
+        rb = RapidityBands(g_t=g_t, mode=mode)
+        zs = [k / 64.0 for k in range(-1024, 1025)]
+        for e in rb.edges:
+            if isfinite(e):
+                lo = hi = e
+                for _ in range(64):                     # the float grid right around each edge
+                    lo, hi = next_float(lo, -30.0), next_float(hi, 30.0)
+                    zs += [rb.sgn * lo, rb.sgn * hi]
+        for z in zs:
+            x = apply_gate(tanh(z), g_t, mode)
+            ok = ok and rb.label(z) == band_of(x)
+            if min(abs(x - t) for t in rb.thresholds) > rb.margin:
+                ok = ok and rb.labels[bisect_right(rb.edges, rb.sgn * z)] == band_of(x)
+    return ok
+
+def test_exact_shard_invariance():
+    # summation="exact": any item order and shard split reproduces the same bits
+    from ssm_ai_quickstart import UWAccumulator
+    items = [((k * 0.37) % 3 - 1.5, (k * 0.61) % 5 - 2.5, 10.0 ** (k % 7 - 3)) for k in range(1000)]
+    whole = UWAccumulator(summation="exact").add_many(items)
+    tail = UWAccumulator(summation="exact").add_many(reversed(items[333:]))
+    head = UWAccumulator(summation="exact").add_many(items[:333])
+    merged = tail.merge(head)
+    return (whole.U_in, whole.V_out, whole.W, whole.rsi()) == (merged.U_in, merged.V_out, merged.W, merged.rsi())
+
+def test_window_accumulators():
+    # ring-buffer window == rsi_from_items over the raw items in the window (events arrive out of order);
+    # decay == direct weighted sums
+    from math import exp, floor, log
+    from ssm_ai_quickstart import DecayedUW, SlidingUW, rsi_from_items
+    events = [(k * 0.7 + (k * 0.37) % 2, (k * 0.61) % 5 - 2.5, (k * 0.43) % 3 - 1.5, 0.5 + (k % 7) / 7)
+              for k in range(3000)]
+    win = SlidingUW(span=60.0, buckets=12)
+    ok = True
+    for n, ev in enumerate(events, 1):
+        win.add(*ev)
+        if n % 250 == 0:
+            items = [(e_in, e_out, w) for ts, e_in, e_out, w in events[:n] if floor(ts / win.width) > win.head - 12]
+            ok = ok and approx(win.rsi(), rsi_from_items(items))
+    ok = ok and win.rsi(events[-1][0] + 61.0) == 0.0 and win.W == 0.0
+    dec = DecayedUW(half_life=30.0).add_many(reversed(events))
+    now, tau, hi = events[-1][0], 30.0 / log(2.0), atanh(1 - EPS_A)
+    U = sum(w * max(-hi, min(hi, -e_in)) * exp((ts - now) / tau) for ts, e_in, e_out, w in events)
+    V = sum(w * max(-hi, min(hi, e_out)) * exp((ts - now) / tau) for ts, e_in, e_out, w in events)
+    W = sum(w * exp((ts - now) / tau) for ts, e_in, e_out, w in events)
+    return ok and approx(dec.rsi(now), tanh((V - U) / W)) and approx(dec.uvw(now)[2], W, 1e-9)
+
+def test_unit_sketch():
+    # sketch median within rel_err of the sorted-sample median; shard merge == one pass, bucket for bucket
+    from ssm_ai_calibrate import AbsQuantileSketch
+    xs = [((k * 0.618034) % 1 - 0.5) * 10.0 ** (k % 9 - 4) for k in range(20000)] + [0.0] * 50
+    exact = sorted(abs(x) for x in xs)[(len(xs) - 1) // 2]
+    whole = AbsQuantileSketch().add_many(xs)
+    merged = AbsQuantileSketch().add_many(xs[1::3])
+    merged.merge(AbsQuantileSketch().add_many(reversed(xs[2::3]))).merge(AbsQuantileSketch().add_many(xs[::3]))
+    return (abs(whole.median() - exact) <= whole.rel_err * exact * (1 + 1e-9)
+            and (merged.bins, merged.zero, merged.count) == (whole.bins, whole.zero, whole.count)
+            and whole.unit() == max(whole.median(), 1e-6) and AbsQuantileSketch().unit() == 1e-6)
+
+def test_tune_c():
+    # tuned c meets both step-4 targets measured with tanh itself; an already-good c0 is kept; c reaches RSI
+    from ssm_ai_calibrate import tune_c
+    from ssm_ai_quickstart import UWAccumulator, rsi_from_items
+    ok = True
+    for scale in (0.05, 0.4, 6.0):
+        e = [scale * ((k * 0.618034) % 1 - 0.5) * 4.0 for k in range(5000)]
+        t = tune_c(e)
+        a = [abs(tanh(t.c * x)) for x in e]
+        sat, dead = sum(v >= 0.90 for v in a) / len(a), sum(v < 0.10 for v in a) / len(a)
+        ok = ok and t.feasible and sat <= 0.10 and dead <= 0.70 and (sat, dead) == (t.saturation, t.dead_zone)
+        ok = ok and (t.c == 1.0) == (scale == 0.4)
+    items = [(0.2, 0.5, 1.0), (-0.3, 0.1, 2.0)]
+    return ok and rsi_from_items(items, c=0.7) == UWAccumulator(c=0.7).add_many(items).rsi() != rsi_from_items(items)
+
+def _split_line_reference(line):
+    # the pre-fast-path vendor_n4_to_csv.split_line (csv.reader for every comma line, regex currency merge)
+    import csv, re
+    s = line.strip()
+    if not s:
+        return []
+    if "," in s:
+        row = [col.strip() for col in next(csv.reader([s])) if col is not None]
+        merged = []
+        i = 0
+        while i < len(row):
+            tok = row[i]
+            if tok.startswith("$"):
+                j = i + 1
+                extra = []
+                while j < len(row) and re.fullmatch(r"\d{3}", row[j]):
+                    extra.append(row[j])
+                    j += 1
+                if extra:
+                    merged.append(tok + "".join(extra))
+                    i = j
+                    continue
+            merged.append(tok)
+            i += 1
+        return merged
+    return re.split(r"\s+", s)
+
+def test_split_line():
+    # split_line fast paths == the reference tokenizer on random lines of digits, '$', commas, quotes,
+    # Arabic-Indic digits and whitespace
+    import random
+    from vendor_n4_to_csv import split_line
+    rng = random.Random(13)
+    alphabet = ["1", "23", "182", "400", "$", "$1", ",", ",", ", ", '"', "a", " ", "\t", "\u0663\u0664\u0665", "-0.5"]
+    lines = ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 24))) for _ in range(20000)]
+    lines += ["svcA,baseline vs lane,12.5,3.0,8.25,4.0,+0.12,$182,400", "svcE a b c 1 2 3 4 0.3 5000",
+              '"svcD","quoted, comparison",1,2,3,4,-0.02,"$1,234"', '"svcD",x,$1,234,"$5,678",$9,000,12']
+    return all(split_line(ln) == _split_line_reference(ln) for ln in lines)
+
+def test_parse_rows():
+    # parse_rows (columnar block path, and its per-row fallback once a block holds a bad number) gives
+    # the same values, reject reasons and messages as parse_row, row by row
+    from vendor_n4_to_csv import parse_row, parse_rows, split_line
+    good = ["svcA,baseline vs lane,12.5,3.0,8.25,4.0,+0.12,$182,400", "svcB lane 1 2 3 4 -0.3 5000",
+            "svcC,a,b,c,1e3,-2,0.5,7,0.1,$1.234", "svcD,x,\u0661.5,2,3,4,0.2,\u0661\u0662\u0663", "svcE,cmp,1,2,3,4,0.1,$99"]
+    bad = ["svcF,short,1", "svcG,cmp,a,b,c,d,e,f", "svcH,$5,1,2,3,4,x", "svcI,cmp,1,2,3,4,0.1,$--"]
+    bad_pct = "svcJ,cmp,x,1,2,3,0.1,$100"
+    def ref(tokens):
+        try:
+            return parse_row(tokens)
+        except ValueError as e:
+            return e
+    def same(got, want):
+        if isinstance(want, ValueError):
+            return (type(got) is type(want) and getattr(got, "reason", None) == getattr(want, "reason", None)
+                    and str(got) == str(want))
+        return got == want
+    ok = True
+    for lines in (good + bad, good + bad + [bad_pct] + good):           # block path, then per-row fallback
+        rows = [split_line(ln) for ln in lines]
+        got = parse_rows(rows)
+        ok = ok and len(got) == len(rows) and all(same(g, ref(t)) for g, t in zip(got, rows))
+    reasons = [getattr(r, "reason", None) for r in parse_rows([split_line(ln) for ln in bad + [bad_pct]])]
+    return ok and reasons == ["row_too_short", "no_amount", "short_tail", "bad_amount", "bad_pct"]
+
+def test_reject_sink():
+    # --rejects: every rejected line lands in the side file (CSV or JSON lines) with file, line number,
+    # reason, message and raw text; --max-errors aborts once the count exceeds the limit
+    import contextlib, csv, io, json, os, tempfile
+    from vendor_n4_to_csv import REJECT_FIELDS, RejectSink, run_batch
+    lines = ["svc,comparison", "svcA,cmp,1,2,3,4,0.1,$100", "svcB,cmp,x,2,3,4,0.1,$100", "",
+             "svcC,short,1", "svcD,cmp,1,2,3,4,0.2,$200", "svcE,cmp,1,2,3,4,0.3,$--"]
+    want = [(3, "bad_pct", lines[2]), (5, "row_too_short", lines[4]), (7, "bad_amount", lines[6])]
+    with tempfile.TemporaryDirectory() as d, contextlib.redirect_stderr(io.StringIO()):
+        src, out = os.path.join(d, "n4.txt"), os.path.join(d, "out.csv")
+        with open(src, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        ok = True
+        for name in ("rejects.csv", "rejects.jsonl"):
+            sink = RejectSink(os.path.join(d, name), echo=0)
+            written = run_batch([src], out, None, 1, 3, sink)
+            sink.close()
+            with open(os.path.join(d, name), newline="", encoding="utf-8") as f:
+                if name.endswith(".csv"):
+                    got = list(csv.reader(f))
+                    ok = ok and got[0] == REJECT_FIELDS
+                    got = [dict(zip(REJECT_FIELDS, r)) for r in got[1:]]
+                else:
+                    got = [json.loads(ln) for ln in f]
+            ok = ok and written == [2] and sink.counts == {"bad_pct": 1, "row_too_short": 1, "bad_amount": 1}
+            ok = ok and [(int(r["line"]), r["reason"], r["raw"]) for r in got] == want
+            ok = ok and all(r["file"] == src and r["message"] for r in got)
+        sink = RejectSink(os.path.join(d, "abort.csv"), max_errors=2, echo=0)
+        try:
+            run_batch([src], out, None, 1, 3, sink)
+            ok = False                                          # 3 rejects > --max-errors 2 must abort
+        except SystemExit as e:
+            ok = ok and sink.total == 3 and "--max-errors=2" in str(e)
+        sink.close()
+        sink = RejectSink(None, max_errors=3, echo=0)           # exactly at the limit: no abort
+        ok = ok and run_batch([src], out, None, 1, 3, sink) == [2] and sink.total == 3
+    return ok
+
+def test_converter_io():
+    # gzip/bz2/xz input (sniffed by magic bytes, from a path or from a pipe-like stream that returns one
+    # byte per read) and compressed CSV output convert to the same rows as plain text; .npz output
+    # round-trips the typed columns (that part needs NumPy)
+    import bz2, csv, gzip, io, lzma, os, tempfile
+    from vendor_n4_to_csv import HEADERS, RejectSink, iter_rows, open_input, run_batch, write_rows
+    class Trickle(io.RawIOBase):
+        def __init__(self, data):
+            self.data = data
+        def readable(self):
+            return True
+        def readinto(self, b):
+            n = min(1, len(b), len(self.data))
+            b[:n], self.data = self.data[:n], self.data[n:]
+            return n
+    text = "svc,comparison\n" + "".join(f"svc{k},cmp {k},{k}.5,{k % 3},{k % 5}.25,{k % 7},+0.{k % 9},${k},{k * 7 % 1000:03d}\n"
+                                        for k in range(40)) + "svcZ,bad,row\n"
+    data = text.encode("utf-8")
+    with tempfile.TemporaryDirectory() as d:
+        plain, want = os.path.join(d, "n4.txt"), os.path.join(d, "want.csv")
+        with open(plain, "wb") as f:
+            f.write(data)
+        run_batch([plain], want, None, 1, 7, RejectSink(echo=0))
+        with open(want, newline="", encoding="utf-8") as f:
+            want_raw = f.read()
+        with open_input(want) as f:                             # text mode: \r\n read back as \n
+            want_text = f.read()
+        ok = want_raw.count("\r\n") == 41
+        for ext, mod in (("gz", gzip), ("bz2", bz2), ("xz", lzma)):
+            src, out = os.path.join(d, f"n4.{ext}"), os.path.join(d, f"out.csv.{ext}")
+            with open(src, "wb") as f:
+                f.write(mod.compress(data))
+            run_batch([src], out, None, 1, 7, RejectSink(echo=0), ext)
+            with open_input(out) as f:
+                ok = ok and f.read() == want_text
+            stream = io.StringIO(newline="")
+            with open_input(io.BufferedReader(Trickle(mod.compress(data)), 1)) as f:
+                write_rows(iter_rows(f, on_reject=lambda *r: None), stream)
+            ok = ok and stream.getvalue() == want_raw
+        with open_input(io.BufferedReader(Trickle(data), 1)) as f:
+            ok = ok and f.read() == text
+        np = _numpy()
+        if np is not None:
+            out = os.path.join(d, "out.npz")
+            run_batch([plain], out, None, 1, 7, RejectSink(echo=0), None, "npz")
+            with open(want, newline="", encoding="utf-8") as f:
+                rows = list(csv.DictReader(f))
+            with np.load(out) as z:
+                ok = ok and sorted(z.files) == sorted(HEADERS) and z["weekly_savings_usd"].dtype == np.int64
+                for k in HEADERS:
+                    col = z[k].tolist()
+                    ok = ok and [type(v)(r[k]) for v, r in zip(col, rows)] == col and len(col) == len(rows)
+    return ok
+
+def test_converter_incremental():
+    # vendor_n4_to_csv --incremental (merged CSV): after a full run, then one input changed / one removed /
+    # one added, the output equals a fresh non-incremental run and only changed inputs are re-parsed;
+    # a settings change or an out_size mismatch invalidates every carried row range.
+    # --out-dir: a removed input's output is deleted, the others match a fresh run
+    import json, os, shutil, tempfile
+    from vendor_n4_to_csv import RejectSink, run_batch, run_incremental
+    def sheet(tag, n):
+        rows = [f"svc{tag}{k},cmp {k},{k}.5,{k % 3},{k % 5}.25,{k % 7},+0.{k % 9},${k},{k * 7 % 1000:03d}"
+                for k in range(n)]
+        return "svc,comparison\n" + "\n".join(rows[:3] + [f"svc{tag}x,bad,row"] + rows[3:]) + "\n"
+    with tempfile.TemporaryDirectory() as d:
+        paths = {t: os.path.join(d, f"{t}.txt") for t in "abcde"}
+        for t, n in zip("abcd", (7, 5, 9, 4)):
+            with open(paths[t], "w") as f:
+                f.write(sheet(t, n))
+        out, fresh, index = os.path.join(d, "merged.csv"), os.path.join(d, "fresh.csv"), os.path.join(d, "idx.json")
+        def inc(tags):
+            return run_incremental([paths[t] for t in tags], out, None, 1, 3, RejectSink(echo=0), None, "csv", index)
+        def same_as_fresh(tags):
+            run_batch([paths[t] for t in tags], fresh, None, 1, 3, RejectSink(echo=0))
+            with open(out, "rb") as f1, open(fresh, "rb") as f2:
+                return f1.read() == f2.read()
+        ok = inc("abcd")[1] == [False] * 4 and same_as_fresh("abcd")
+        ok = ok and inc("abcd")[1] == [True] * 4 and same_as_fresh("abcd")
+        with open(paths["b"], "w") as f:
+            f.write(sheet("B", 6))
+        with open(paths["e"], "w") as f:
+            f.write(sheet("e", 3))
+        written, same = inc("abde")                              # b changed, c removed, e added
+        ok = ok and same == [True, False, True, False] and written == [7, 6, 4, 3] and same_as_fresh("abde")
+        with open(out, "a") as f:                                # output touched behind the index's back
+            f.write("svcZ,stray,1,2,3,4,0,5\n")
+        ok = ok and inc("abde")[1] == [False] * 4 and same_as_fresh("abde")
+        with open(index) as f:
+            idx = json.load(f)
+        idx["settings"]["codec"] = "xz"                          # recorded under other settings
+        with open(index, "w") as f:
+            json.dump(idx, f)
+        ok = ok and inc("abde")[1] == [False] * 4 and same_as_fresh("abde")
+        od, od_fresh, od_index = os.path.join(d, "out"), os.path.join(d, "out_fresh"), os.path.join(d, "od.json")
+        os.makedirs(od)
+        def inc_dir(tags):
+            return run_incremental([paths[t] for t in tags], None, od, 1, 3, RejectSink(echo=0), None, "csv",
+                                   od_index)
+        def dir_as_fresh(tags):
+            shutil.rmtree(od_fresh, ignore_errors=True)
+            os.makedirs(od_fresh)
+            run_batch([paths[t] for t in tags], None, od_fresh, 1, 3, RejectSink(echo=0))
+            if sorted(os.listdir(od)) != sorted(os.listdir(od_fresh)):
+                return False
+            for name in os.listdir(od):
+                with open(os.path.join(od, name), "rb") as f1, open(os.path.join(od_fresh, name), "rb") as f2:
+                    if f1.read() != f2.read():
+                        return False
+            return True
+        ok = ok and inc_dir("abde")[1] == [False] * 4 and dir_as_fresh("abde")
+        ok = ok and inc_dir("ade")[1] == [True] * 3 and dir_as_fresh("ade")          # b removed
+    return ok
+
+def _lens_groups(n=300, seed=7):
+    # candidates of 0..12 lens items (e_in, e_out, w): mixed scales, saturating e (eps_a clamp), zero weights,
+    # empty groups (zero evidence)
+    import random
+    rng = random.Random(seed)
+    groups = []
+    for k in range(n):
+        scale = (0.1, 1.0, 30.0)[k % 3]
+        groups.append([(rng.gauss(0, scale), rng.gauss(0, scale), rng.choice((0.0, 0.5, 1.0, rng.random() * 3)))
+                       for _ in range(rng.randint(0, 12))])
+    return groups
+
+def test_rsi_batch():
+    # rsi_batch (offsets or ids layout, every batch summation) == rsi_from_items per candidate, c = 1 and 2.5
+    np = _numpy()
+    if np is None:
+        return None
+    from ssm_ai_batch import BATCH_SUMMATION_MODES, pack_groups, rsi_batch, rsi_groups
+    from ssm_ai_quickstart import rsi_from_items
+    groups = _lens_groups()
+    e_in, e_out, w, offsets = pack_groups(groups)
+    ids = np.repeat(np.arange(len(groups)), np.diff(offsets))
+    perm = np.random.default_rng(3).permutation(len(w))          # ids layout: items in any order
+    ok = True
+    for c in (1.0, 2.5):
+        want = [rsi_from_items(g, c=c) for g in groups]
+        for summation in BATCH_SUMMATION_MODES:
+            got = rsi_batch(e_in, e_out, w, offsets=offsets, c=c, summation=summation).tolist()
+            ok = ok and all(approx(x, y) for x, y in zip(got, want)) and len(got) == len(want)
+            got = rsi_batch(e_in[perm], e_out[perm], w[perm], ids=ids[perm], n_cand=len(groups), c=c,
+                            summation=summation).tolist()
+            ok = ok and all(approx(x, y) for x, y in zip(got, want)) and len(got) == len(want)
+        ok = ok and all(approx(x, y) for x, y in zip(rsi_groups(groups, c=c), want))
+        ok = ok and all(x == 0.0 for x, g in zip(rsi_groups(groups, c=c), groups) if not g)
+    return ok
+
+def test_parallel_bits():
+    # ssm_ai_parallel: same bits for 1, 2 and 3 workers (fork ranges and pickled shards) at a fixed
+    # shard size, for one large item set and for many candidates; concurrent runs from two threads too
+    import threading
+    from ssm_ai_parallel import rsi_groups_parallel, uvw_parallel
+    from ssm_ai_quickstart import rsi_from_items
+    groups = _lens_groups(200)
+    items = [it for g in groups for it in g]
+    want = uvw_parallel(items, workers=1, shard_size=97)
+    lanes = (want.U_in, want.V_out, want.W, want.rsi())
+    ok = True
+    for n in (2, 3):
+        for data in (items, iter(items)):
+            acc = uvw_parallel(data, workers=n, shard_size=97)
+            ok = ok and (acc.U_in, acc.V_out, acc.W, acc.rsi()) == lanes
+    ref = [rsi_from_items(g) for g in groups]
+    ok = ok and all(rsi_groups_parallel(groups, workers=n, groups_per_shard=17) == ref for n in (1, 2, 3))
+    got = [None, None]
+    def run(i):
+        got[i] = uvw_parallel(items, workers=2, shard_size=97).rsi()
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return ok and got == [lanes[3]] * 2
+
+def test_summation_modes():
+    # UWAccumulator summation modes on an ill-conditioned lane (two 1e16 weights cancelling around many
+    # unit items): "exact" == math.fsum of the rounded terms bit for bit, also merged from shards in any
+    # order; "neumaier" within a few ulp of it where "naive" is off; all modes agree on benign candidates.
+    # Batch: segment_sum "exact" == UWAccumulator "exact" bits, "pairwise" within 1e-12 (NumPy only)
+    from math import fsum
+    from ssm_ai_quickstart import SUMMATION_MODES, UWAccumulator, map_to_rapidity, rsi_from_items
+    items = [(0.0, 1.0, 1e16)] + [(-0.001 * k, 0.5, 1.0) for k in range(1, 2001)] + [(0.0, -1.0, 1e16)]
+    terms = [(w * u_in, w * u_out, w) for e_in, e_out, w in items for u_in, u_out in [map_to_rapidity(e_in, e_out)]]
+    ref = [fsum(t[j] for t in terms) for j in range(3)]
+    lanes = {}
+    for mode in SUMMATION_MODES:
+        acc = UWAccumulator(summation=mode).add_many(items)
+        lanes[mode] = [acc.U_in, acc.V_out, acc.W]
+    ok = lanes["exact"] == ref
+    ok = ok and all(abs(x - r) <= 4 * abs(r) * 2.0 ** -52 for x, r in zip(lanes["neumaier"], ref))
+    ok = ok and abs(lanes["naive"][2] - ref[2]) > 1000.0                # naive drops the unit weights
+    shards = [items[k:k + 333] for k in range(0, len(items), 333)]
+    merged = UWAccumulator(summation="exact")
+    for s in reversed(shards):
+        merged.merge(UWAccumulator(summation="exact").add_many(reversed(s)))
+    ok = ok and [merged.U_in, merged.V_out, merged.W] == ref
+    groups = _lens_groups(100)
+    for mode in SUMMATION_MODES:
+        ok = ok and all(approx(UWAccumulator(summation=mode).add_many(g).rsi(), rsi_from_items(g)) for g in groups)
+    np = _numpy()
+    if np is not None:
+        from ssm_ai_batch import segment_sum
+        vals = np.array(terms).T
+        seg = np.zeros(len(terms), dtype=np.int64)
+        ok = ok and segment_sum(vals, seg, 1, "exact")[:, 0].tolist() == ref
+        flat = [it for g in groups for it in g]
+        seg = np.repeat(np.arange(len(groups)), [len(g) for g in groups])
+        vals = np.array([(w * ui, w * uo, w) for e_in, e_out, w in flat
+                         for ui, uo in [map_to_rapidity(e_in, e_out)]]).T
+        exact, pairwise = segment_sum(vals, seg, len(groups), "exact"), segment_sum(vals, seg, len(groups), "pairwise")
+        for j, g in enumerate(groups):
+            acc = UWAccumulator(summation="exact").add_many(g)
+            ok = ok and exact[:, j].tolist() == [acc.U_in, acc.V_out, acc.W]
+            ok = ok and all(approx(x, y) for x, y in zip(pairwise[:, j].tolist(), exact[:, j].tolist()))
+    return ok
+
+def test_float32_mode():
+    # dtype="float32": the eps floors are enforced (eps_w >= 1e-8, eps_a >= 2^-23) and rsi_batch stays within
+    # 1e-6 (the replay tolerance for float32 rows) of float64 rsi_from_items run with the same floors,
+    # in every batch summation mode; a candidate with W below 1e-8 shows the raised eps_w
+    np = _numpy()
+    if np is None:
+        return None
+    from ssm_ai_batch import BATCH_SUMMATION_MODES, eps_for, pack_groups, rsi_batch
+    from ssm_ai_quickstart import rsi_from_items
+    ok = eps_for("float32") == (1e-8, EPS_A) and eps_for("float32", 1e-12, 1e-9) == (1e-8, 2.0 ** -23)
+    ok = ok and eps_for("float64", 1e-12, 1e-9) == (1e-12, 1e-9)
+    groups = _lens_groups(400) + [[(0.0, 0.3, 4e-9), (0.1, 0.0, 2e-9)]]
+    e_in, e_out, w, offsets = pack_groups(groups)
+    for c in (1.0, 2.5):
+        want = [rsi_from_items(g, eps_w=1e-8, c=c) for g in groups]
+        for summation in BATCH_SUMMATION_MODES:
+            got = rsi_batch(e_in, e_out, w, offsets=offsets, c=c, summation=summation, dtype="float32")
+            ok = ok and got.dtype == np.float32 and np.abs(got - np.array(want)).max() <= 1e-6
+    tiny = rsi_batch(e_in, e_out, w, offsets=offsets, dtype="float32")[-1]
+    return ok and abs(tiny - rsi_from_items(groups[-1])) > 0.05         # W = 6e-9: 0.14 here, 0.23 at eps_w=1e-12
+
+def test_serve_kernels():
+    # ssm_ai_serve.MicroBatcher: the numpy and python kernels give the same RSI / RSI_env (1e-12) and bands
+    # for item groups and U/V/W candidates, both gate modes, g_t of either sign and c = 2.5, with requests
+    # from several threads coalesced into multi-request batches (max_batch=7)
+    np = _numpy()
+    if np is None:
+        return None
+    import json, threading
+    from ssm_ai_serve import MicroBatcher, parse_request
+    groups = _lens_groups(60)
+    bodies = []
+    for k in range(12):
+        cands = [[list(it) for it in g] for g in groups[5 * k:5 * k + 5]]
+        cands += [{"U_in": 0.3 * k - 1, "V_out": 0.5, "W": (k % 3) * 0.7}]
+        bodies.append(json.dumps({"candidates": cands, "g_t": (0.81, -0.5, 1.7)[k % 3],
+                                  "mode": ("mul", "u_scale")[k % 2]}).encode())
+    results = {}
+    for kernel in ("numpy", "python"):
+        batcher = MicroBatcher(max_batch=7, max_wait=0.002, kernel=kernel, c=2.5)
+        out = [None] * len(bodies)
+        def run(i):
+            out[i] = batcher.submit(parse_request(bodies[i]))
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(len(bodies))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        results[kernel] = [r for rs in out for r in rs]
+    ok = len(results["numpy"]) == len(results["python"]) == 72
+    for a, b in zip(results["numpy"], results["python"]):
+        ok = ok and approx(a["RSI"], b["RSI"]) and approx(a["RSI_env"], b["RSI_env"]) and a["band"] == b["band"]
+    return ok
+
+def test_band_codes():
+    # ssm_ai_batch.band_codes == band_of on every threshold, the floats either side of it, +-1, +-inf and NaN
+    np = _numpy()
+    if np is None:
+        return None
+    from ssm_ai_batch import band_codes, band_labels
+    from ssm_ai_quickstart import band_of
+    xs = [0.0, -0.0, 1.0, -1.0, float("inf"), float("-inf"), float("nan")]
+    for t in (0.90, 0.60, -0.60, -0.90):
+        xs += [t, next_float(t, 2.0), next_float(t, -2.0)]
+    got = band_labels(band_codes(np.array(xs))).tolist()
+    return got == [band_of(x) for x in xs] and band_labels(band_codes(float("nan"))).tolist() == "A--"
+
+def test_band_tracker():
+    # BandTracker hysteresis, one entity over many rounds (one value per batch, and all values in one
+    # batch) == the scalar rule on band_of codes: promote if x >= tau + h_up, demote if x <= tau - h_dn
+    np = _numpy()
+    if np is None:
+        return None
+    from ssm_ai_batch import BandTracker
+    from ssm_ai_quickstart import RapidityBands, band_of
+    labels = RapidityBands().labels
+    code = lambda x: labels.index(band_of(x))
+    h_up, h_dn = 0.02, 0.03
+    xs = [0.0, 0.61, 0.62, 0.63, 0.89, 0.915, 0.92, 0.88, 0.87, 0.86, 0.59, 0.57, -0.6, -0.61, -0.62, -0.64,
+          -0.92, -0.94, -0.89, -0.88, 0.9, 0.95, -0.58, 0.61, 0.6, 0.57]
+    xs += [0.75 * tanh(k * 0.37) + 0.3 * tanh(k * 1.13) for k in range(200)]
+    ref, cur = [], None
+    for x in xs:
+        if cur is None:
+            cur = code(x)
+        else:
+            up, dn = code(x - h_up), code(x + h_dn)
+            cur = up if up > cur else dn if dn < cur else cur
+        ref.append(labels[cur])
+    one = BandTracker(h_up=h_up, h_dn=h_dn, capacity=1)
+    ok = one.band("svc") is None
+    for x, want in zip(xs, ref):
+        one.update_keys(["svc"], [x])
+        ok = ok and one.band("svc") == want
+    many = BandTracker(h_up=h_up, h_dn=h_dn, capacity=1)
+    t = many.update_keys(["pad", "svc"] * len(xs), [v for x in xs for v in (0.0, x)], emit_initial=True)
+    seen = [labels[c] for e, c in zip(t.entity.tolist(), t.new.tolist()) if e == 1]
+    changes = [b for i, b in enumerate(ref) if i == 0 or b != ref[i - 1]]
+    ok = ok and many.band("svc") == ref[-1] and seen == changes
+    unseen = BandTracker(capacity=1)
+    unseen.ids_for("xyz")                                   # registered past the arrays, never updated
+    return ok and unseen.band("z") is None
+
+def test_decision_log():
+    # SSMLOG2 round trip across rotations: repeated, empty, missing and non-ASCII notes come back exactly
+    # through read_footer + iter_rows; a hand-built SSMLOG1 file (note dictionary-encoded) still reads
+    import json, os, tempfile
+    from ssm_ai_log import (DICT_FIELDS, END_MAGIC, FLOAT_FIELDS, HEADER, HEADER_SIZE, LOG_FIELDS, MAGIC_V1,
+                            RECORD_V1, TRAILER, DecisionLogWriter, from_epoch_us, iter_rows, read_footer)
+    notes = ["window=10s n=3", "window=10s n=3", "", None, "\u00fcber \u0394 \u2713 \u96e8", "\u00fcber \u0394 \u2713 \u96e8",
+             "window=10s n=3", "x", "", "x"]
+    rows = []
+    for k, note in enumerate(notes):
+        row = {"iso_utc": 1.7e9 + k * 0.25, "svc": f"svc{k % 3}", "knobs_hash": "h1", "m": k * 0.5,
+               "a": tanh(k * 0.1), "U": k / 3.0, "W": 1.0 + k, "RSI": tanh(-k * 0.07), "g_t": 0.81,
+               "RSI_env": 0.81 * tanh(-k * 0.07), "band": "A0"}
+        if note is not None:
+            row["note"] = note
+        rows.append(row)
+    with tempfile.TemporaryDirectory() as d:
+        with DecisionLogWriter(os.path.join(d, "log"), rotate_rows=4, buffer_rows=3) as w:
+            w.write_many(rows)
+        metas = [read_footer(p) for p in w.paths]
+        ok = [m["rows"] for m in metas] == [4, 4, 2] and all(m["version"] == 2 for m in metas)
+        ok = ok and not any(os.path.exists(p + ".notes") for p in w.paths)
+        got = [r for p in w.paths for r in iter_rows(p)]
+        for row, back in zip(rows, got):
+            want = dict(row, iso_utc=from_epoch_us(round(row["iso_utc"] * 1_000_000)), dtype="float64",
+                        division_policy="strict", note=row.get("note", ""))
+            ok = ok and back == {k: want[k] for k in LOG_FIELDS}
+        ok = ok and len(got) == len(rows)
+        v1 = os.path.join(d, "old.ssmlog")                      # SSMLOG1: every string column in the footer dicts
+        dicts = {"svc": ["svcA"], "knobs_hash": ["h0"], "dtype": ["float64"], "band": ["A+", "A0"],
+                 "division_policy": ["strict"], "note": ["", "\u00e9t\u00e9"]}
+        recs = [(1_700_000_000_000_000 + k, *[k + 0.5] * len(FLOAT_FIELDS), 0, 0, 0, k % 2, 0, k % 2)
+                for k in range(3)]
+        footer = json.dumps({"fields": LOG_FIELDS, "dicts": dicts, "rows": len(recs)}).encode("utf-8")
+        with open(v1, "wb") as f:
+            f.write(HEADER.pack(MAGIC_V1, RECORD_V1.size, HEADER_SIZE).ljust(HEADER_SIZE, b"\0"))
+            f.write(b"".join(RECORD_V1.pack(*r) for r in recs))
+            f.write(footer + TRAILER.pack(len(footer), END_MAGIC))
+        old = list(iter_rows(v1))
+        ok = ok and read_footer(v1)["version"] == 1 and len(old) == 3 and len(DICT_FIELDS) == 5
+        ok = ok and [(r["band"], r["note"], r["m"]) for r in old] == [("A+", "", 0.5), ("A0", "\u00e9t\u00e9", 1.5),
+                                                                      ("A+", "", 2.5)]
+    return ok
+
+def test_stream_lateness():
+    # a window closed by event time (max_ts - lateness) rejects late events before any flush runs,
+    # so the summaries do not depend on when the timer fires
+    from ssm_ai_stream import WindowedUW
+    agg = WindowedUW(window=10.0, lateness=5.0)
+    for k in range(10):
+        agg.add("a", float(k), 1.0, 0.1, 0.2, 1.0, 1.0)       # window 0
+    agg.add("a", 49.0, 1.0, 0.1, 0.2, 1.0, 1.0)               # closes windows <= 3
+    agg.add("a", 3.0, 1.0, 0.1, 0.2, 1.0, 1.0)                # late: window 0 is closed, though unflushed
+    agg.add("a", 44.0, 1.0, 0.1, 0.2, 1.0, 1.0)               # window 4 still open (44 >= 49 - 5)
+    rows = {r["window_start"]: r["count"] for r in agg.flush(final=True)}
+    return agg.late == 1 and rows == {0.0: 10, 40.0: 2}
+
+# ---------- replay verifier for decision logs (NumPy; .ssmlog memory-mapped, .csv streamed) ----------
+REPLAY_CHUNK = 1 << 20          # rows per vectorized chunk
+REPLAY_CHECKS = ("fuse", "gate", "band", "zero_evidence", "bounds")
+
+def _replay_chunk(np, c, band_code, tol, thresholds, zero_code, eps_w, eps_a, gate_mode):
+    # c: column arrays for one chunk -> {check: violation mask}
+    # fuse          a == tanh(U / max(W, eps_w))
+    # gate          RSI_env == clamp(g_t * clamp(RSI))  or  clamp(tanh(g_t * atanh(clamp(RSI))))
+    # band          band == band of RSI_env (no hysteresis)
+    # zero_evidence W <= 0  =>  RSI == 0 and band == the band of 0 ("A0")
+    # bounds        a, RSI, RSI_env finite and inside (-1, +1)
+    from ssm_ai_batch import band_codes
+    a, U, W, RSI, g, env = c["a"], c["U"], c["W"], c["RSI"], c["g_t"], c["RSI_env"]
+    lo, hi = -1 + eps_a, 1 - eps_a
+    x = np.clip(RSI, lo, hi)
+    y = np.clip(g * x if gate_mode == "mul" else np.tanh(g * np.arctanh(x)), lo, hi)
+    with np.errstate(all="ignore"):
+        return {
+            "fuse": ~(np.abs(a - np.tanh(U / np.maximum(W, eps_w))) <= tol),
+            "gate": ~(np.abs(env - y) <= tol),
+            "band": band_code != band_codes(env, thresholds) if thresholds is not None else np.zeros(len(a), bool),
+            "zero_evidence": (W <= 0) & ((RSI != 0) | (band_code != zero_code)),
+            "bounds": ~((np.abs(a) < 1) & (np.abs(RSI) < 1) & (np.abs(env) < 1)),
+        }
+
+def _replay_chunks(np, path, labels, chunk):
+    # -> (first row offset, column dict, band codes in `labels` order, is_float32 mask) per chunk
+    from ssm_ai_log import FLOAT_FIELDS, open_records
+    code_of = {lab: i for i, lab in enumerate(labels)}
+    if path.endswith(".csv"):
+        import csv
+        with open(path, newline="", encoding="utf-8") as f:
+            rows, start = [], 0
+            for row in csv.DictReader(f):
+                rows.append(row)
+                if len(rows) == chunk:
+                    yield _csv_chunk(np, rows, start, code_of, FLOAT_FIELDS)
+                    start += len(rows)
+                    rows = []
+            if rows:
+                yield _csv_chunk(np, rows, start, code_of, FLOAT_FIELDS)
+        return
+    rec, meta = open_records(path)
+    band_lut = np.array([code_of.get(lab, 255) for lab in meta["dicts"]["band"]] or [255], dtype=np.int64)
+    f32_lut = np.array([d == "float32" for d in meta["dicts"]["dtype"]] or [False])
+    for start in range(0, len(rec), chunk):
+        part = rec[start:start + chunk]
+        cols = {k: np.asarray(part[k]) for k in FLOAT_FIELDS}
+        yield start, cols, band_lut[part["band"]], f32_lut[part["dtype"]]
+
+def _csv_chunk(np, rows, start, code_of, float_fields):
+    cols = {k: np.array([float(r[k]) for r in rows]) for k in float_fields}
+    band = np.array([code_of.get(r["band"], 255) for r in rows], dtype=np.int64)
+    f32 = np.array([r["dtype"] == "float32" for r in rows])
+    return start, cols, band, f32
+
+def replay_verify(paths, eps_w=EPS_W, eps_a=EPS_A, gate_mode="mul", bands=None, check_band=True,
+                  tol=1e-12, tol32=1e-6, chunk=REPLAY_CHUNK, max_report=20):
+    # Re-check replay invariants over decision logs in vectorized chunks
+    # -> (rows checked, {check: violations}, [(path, row offset, check), ...] up to max_report)
+    import numpy as np
+    from ssm_ai_batch import band_codes, band_table, eps_for
+    labels, thresholds = band_table(bands)
+    eps_w32, eps_a32 = eps_for("float32", eps_w, eps_a)    # float32 rows were scored with the raised floors
+    zero_code = int(band_codes(np.zeros(1), thresholds)[0])
+    counts = {k: 0 for k in REPLAY_CHECKS}
+    samples, total = [], 0
+    for path in paths:
+        for start, cols, band_code, f32 in _replay_chunks(np, path, labels, chunk):
+            row_tol = np.where(f32, tol32, tol)
+            masks = _replay_chunk(np, cols, band_code, row_tol, thresholds if check_band else None, zero_code,
+                                  np.where(f32, eps_w32, eps_w), np.where(f32, eps_a32, eps_a), gate_mode)
+            for check, mask in masks.items():
+                bad = np.flatnonzero(mask)
+                counts[check] += len(bad)
+                for off in bad[:max(0, max_report - len(samples))].tolist():
+                    samples.append((path, start + off, check))
+            total += len(band_code)
+    return total, counts, samples
+
+def test_replay_verify():
+    # replay_verify passes a clean rotated log, then flags one corrupted `a` lane (file 2, row 5) as a fuse
+    # violation at that file and row offset, with chunks smaller than a file
+    np = _numpy()
+    if np is None:
+        return None
+    import os, struct, tempfile
+    from ssm_ai_log import DecisionLogWriter, read_footer
+    from ssm_ai_quickstart import band_of
+    rows = []
+    for k in range(20):
+        W = (k % 5) * 0.5
+        U = (k % 7 - 3) * 0.4 if W > 0 else 0.0                     # zero evidence: no items at all
+        rsi = tanh(U / W) if W > 0 else 0.0
+        env = clamp_align(0.81 * clamp_align(rsi))
+        rows.append({"iso_utc": 1.7e9 + k, "svc": "svcA", "knobs_hash": "h1", "m": 1.0,
+                     "a": tanh(U / max(W, EPS_W)), "U": U, "W": W, "RSI": rsi, "g_t": 0.81, "RSI_env": env,
+                     "band": band_of(env)})
+    with tempfile.TemporaryDirectory() as d:
+        with DecisionLogWriter(os.path.join(d, "log"), rotate_rows=8) as w:
+            w.write_many(rows)
+        total, counts, samples = replay_verify(w.paths, chunk=3)
+        ok = total == 20 and not any(counts.values()) and samples == []
+        meta = read_footer(w.paths[1])
+        pos = meta["data_offset"] + 5 * meta["record_size"] + 16         # ts_us, m, then a
+        with open(w.paths[1], "r+b") as f:
+            f.seek(pos)
+            a = struct.unpack("<d", f.read(8))[0]
+            f.seek(pos)
+            f.write(struct.pack("<d", a + 1e-6))
+        total, counts, samples = replay_verify(w.paths, chunk=3)
+        ok = ok and total == 20 and samples == [(w.paths[1], 5, "fuse")]
+        ok = ok and counts == dict(dict.fromkeys(REPLAY_CHECKS, 0), fuse=1)
+    return ok
+
+def run_replay(argv):
+    import argparse
+    ap = argparse.ArgumentParser(description="Replay-verify SSM-AI decision logs (.ssmlog or .csv).")
+    ap.add_argument("--replay", nargs="+", required=True, metavar="LOG", help="decision log files")
+    ap.add_argument("--gate-mode", choices=("mul", "u_scale"), default="mul")
+    ap.add_argument("--no-band", action="store_true", help="skip the band check (hysteresis enabled upstream)")
+    ap.add_argument("--max-report", type=int, default=20, help="violations to list with row offsets")
+    args = ap.parse_args(argv)
+    total, counts, samples = replay_verify(args.replay, gate_mode=args.gate_mode,
+                                           check_band=not args.no_band, max_report=args.max_report)
+    for path, row, check in samples:
+        print(f"VIOLATION {check}: {path} row {row}")
+    for check in REPLAY_CHECKS:
+        print(f"{check}: {'PASS' if counts[check] == 0 else 'FAIL'} ({counts[check]} of {total} rows)")
+    ok = not any(counts.values())
+    print("replay:", "PASS" if ok else "FAIL")
+    return ok
+
 def run():
     tests = [
         ("clamp_roundtrip", test_clamp_roundtrip()),
         ("fuse_invariance", test_fuse_invariance()),
         ("lane_mul_div_M2", test_lane_mul_div_M2()),
         ("chooser",         test_chooser()),
+        ("top_k",           test_top_k()),
+        ("rapidity_fastpath", test_rapidity_fastpath()),
+        ("exact_shard_invariance", test_exact_shard_invariance()),
+        ("rapidity_bands", test_rapidity_bands()),
+        ("window_accumulators", test_window_accumulators()),
+        ("unit_sketch",     test_unit_sketch()),
+        ("tune_c",          test_tune_c()),
+        ("split_line",      test_split_line()),
+        ("parse_rows",      test_parse_rows()),
+        ("reject_sink",     test_reject_sink()),
+        ("converter_io",    test_converter_io()),
+        ("converter_incremental", test_converter_incremental()),
+        ("stream_lateness", test_stream_lateness()),
+        ("rsi_batch",       test_rsi_batch()),
+        ("parallel_bits",   test_parallel_bits()),
+        ("summation_modes", test_summation_modes()),
+        ("float32_mode",    test_float32_mode()),
+        ("serve_kernels",   test_serve_kernels()),
+        ("band_codes",      test_band_codes()),
+        ("band_tracker",    test_band_tracker()),
+        ("decision_log",    test_decision_log()),
+        ("replay_verify",   test_replay_verify()),
     ]
     ok = True
     for name, passed in tests:
-        print(f"{name}: {'PASS' if passed else 'FAIL'}")
-        ok = ok and passed
+        print(f"{name}: {'SKIP' if passed is None else 'PASS' if passed else 'FAIL'}")
+        ok = ok and (passed is None or bool(passed))
     print("overall:", "PASS" if ok else "FAIL")
 
 if __name__ == "__main__":
+    import sys
+    if "--replay" in sys.argv[1:]:
+        sys.exit(0 if run_replay(sys.argv[1:]) else 1)
     run()
@@ -3,16 +3,33 @@
 # Usage examples:
 #   python vendor_n4_to_csv.py --in N4.txt --out vendor_datasheet_N4.csv
 #   type N4.txt | python vendor_n4_to_csv.py --stdin --out vendor_datasheet_N4.csv
+#   python vendor_n4_to_csv.py --glob "sheets/*.txt" --out merged.csv --workers 8
+#   python vendor_n4_to_csv.py --glob sheets --out-dir normalized
+#   python vendor_n4_to_csv.py --in N4.txt.xz --out vendor_datasheet_N4.csv.gz
+#   python vendor_n4_to_csv.py --glob sheets --out merged.csv --incremental
+#   python vendor_n4_to_csv.py --in N4.txt --out N4.csv --rejects N4_rejects.csv --max-errors 100
 #
 # This version fixes a bug where any row starting with "svc..." was incorrectly
 # treated as a header and discarded. We now only skip a true header line whose
 # first field is exactly "svc" (case-insensitive), optionally followed by "comparison", etc.
 
+import os
 import sys
+import io
+import glob
 import argparse
 import csv
+import json
 import re
-from typing import List, Optional
+import gzip
+import bz2
+import lzma
+import hashlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from array import array
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple, Union
 
 HEADERS = [
     "svc",
@@ -34,33 +51,36 @@ def split_line(line: str) -> List[str]:
         return []
     # Prefer CSV if commas are present
     if "," in s:
-        # Use csv to respect quoted fields
-        reader = csv.reader([s])
-        row = next(reader)
-        row = [col.strip() for col in row if col is not None]
-        # Merge unquoted currency fragments like $182,400 -> $182400
-        merged = []
-        i = 0
-        while i < len(row):
-            tok = row[i]
-            if tok.startswith("$"):
-                j = i + 1
-                extra = []
-                while j < len(row) and re.fullmatch(r"\d{3}", row[j]):
-                    extra.append(row[j])
-                    j += 1
-                if extra:
-                    merged.append(tok + "".join(extra))
-                    i = j
-                    continue
-                merged.append(tok)
-                i += 1
-            else:
-                merged.append(tok)
-                i += 1
-        return merged
+        if '"' in s:
+            # Use csv to respect quoted fields
+            row = next(csv.reader([s]))
+            row = [col.strip() for col in row if col is not None]
+            return merge_currency(row) if "$" in s else row
+        # Fast path: without quotes csv.reader is a plain comma split, and no field before the
+        # first "$" can start a currency token, so only the tail from that field is merged
+        row = [col.strip() for col in s.split(",")]
+        first = s.find("$")
+        if first < 0:
+            return row
+        k = s.count(",", 0, first)
+        return row[:k] + merge_currency(row[k:])
     # Fallback: split on any whitespace
-    return re.split(r"\s+", s)
+    return s.split()
+
+def merge_currency(row: List[str]) -> List[str]:
+    # Merge unquoted currency fragments like $182,400 -> $182400
+    # (a 3-digit group is len 3 + isdecimal, i.e. re.fullmatch(r"\d{3}", tok) without the regex call)
+    merged = []
+    i, n = 0, len(row)
+    while i < n:
+        tok = row[i]
+        i += 1
+        if tok.startswith("$"):
+            while i < n and len(row[i]) == 3 and row[i].isdecimal():
+                tok += row[i]
+                i += 1
+        merged.append(tok)
+    return merged
 
 def is_header(fields: List[str]) -> bool:
     """
@@ -90,36 +110,56 @@ def find_usd_token(tokens: List[str]) -> Optional[int]:
             return i
     return None
 
+class RowError(ValueError):
+    """
+    A rejected row. `reason` is a short stable code (REJECT_REASONS) for counters and the rejects sink.
+    """
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+REJECT_REASONS = ("row_too_short", "no_amount", "short_tail", "bad_pct", "bad_amount")
+
+_NON_DIGITS = re.compile(r"[^\d]")
+
 def coerce_int_from_currency(tok: str) -> int:
     # Strip non-digits and parse
-    digits = re.sub(r"[^\d]", "", tok)
+    digits = _NON_DIGITS.sub("", tok)
     if not digits:
-        raise ValueError(f"cannot parse integer from currency token: {tok!r}")
+        raise RowError("bad_amount", f"cannot parse integer from currency token: {tok!r}")
     return int(digits)
 
-def parse_row(tokens: List[str]) -> dict:
+def locate_usd(tokens: List[str]) -> int:
     """
-    Expect the layout:
-      svc, comparison..., <tokens_saved_pct> <retry_drop_pct> <latency_saved_pct> <unit_cost_saved_pct> <RSI_pool_env_delta> $<weekly_savings_usd>
-    'comparison' may contain spaces or commas depending on source format.
+    Index of the USD amount token for parse_row: the rightmost '$' token, else the rightmost
+    pure integer, with at least svc + 5 tail fields before it. Raises ValueError otherwise.
     """
     if len(tokens) < 7:
-        raise ValueError(f"row too short: {tokens}")
+        raise RowError("row_too_short", f"row too short: {tokens}")
 
     usd_idx = find_usd_token(tokens)
     if usd_idx is None:
-        # try to find a trailing pure integer as dollars
+        # try to find a trailing pure integer as dollars (isdecimal == re.fullmatch(r"\d+"))
         for i in range(len(tokens) - 1, -1, -1):
-            if re.fullmatch(r"\d+", tokens[i].strip()):
+            if tokens[i].strip().isdecimal():
                 usd_idx = i
                 break
     if usd_idx is None:
-        raise ValueError(f"cannot find USD or integer amount token in: {tokens}")
+        raise RowError("no_amount", f"cannot find USD or integer amount token in: {tokens}")
 
     # We expect 5 numeric-ish tokens immediately before the USD token
+    if usd_idx - 5 < 1:
+        raise RowError("short_tail", f"not enough fields before USD token: {tokens}")
+    return usd_idx
+
+def parse_row(tokens: List[str]) -> dict:
+    """
+    Expect the layout:
+      svc, comparison..., <tokens_saved_pct> <retry_drop_pct> <latency_saved_pct> <unit_cost_saved_pct> <RSI_pool_env_delta> $<weekly_savings_usd>
+    'comparison' may contain spaces or commas depending on source format.
+    """
+    usd_idx = locate_usd(tokens)
     tail_start = usd_idx - 5
-    if tail_start < 1:
-        raise ValueError(f"not enough fields before USD token: {tokens}")
 
     head = tokens[:tail_start]
     tail = tokens[tail_start:usd_idx]
@@ -136,7 +176,7 @@ def parse_row(tokens: List[str]) -> dict:
         latency_saved_pct   = float(tail[2])
         unit_cost_saved_pct = float(tail[3])
     except Exception as e:
-        raise ValueError(f"failed to parse numeric percentages from tail={tail} in row={tokens}: {e}")
+        raise RowError("bad_pct", f"failed to parse numeric percentages from tail={tail} in row={tokens}: {e}")
 
     RSI_pool_env_delta = tail[4].strip()
 
@@ -158,23 +198,99 @@ def parse_row(tokens: List[str]) -> dict:
         "weekly_savings_usd": weekly_savings_usd,
     }
 
-def main():
-    ap = argparse.ArgumentParser(description="Normalize N4 vendor sheet to CSV.")
-    src = ap.add_mutually_exclusive_group(required=True)
-    src.add_argument("--in", dest="infile", help="Path to input TXT/CSV/TSV")
-    src.add_argument("--stdin", action="store_true", help="Read from STDIN")
-    ap.add_argument("--out", dest="outfile", required=True, help="Path to output CSV")
-    args = ap.parse_args()
+PARSE_BLOCK = 4096   # rows per columnar parse block in iter_rows
 
-    # Read raw lines
-    if args.infile:
-        with open(args.infile, "r", encoding="utf-8") as f:
-            raw_lines = f.readlines()
-    else:
-        raw_lines = sys.stdin.read().splitlines()
+def parse_rows(token_rows: List[List[str]]) -> List[Union[dict, ValueError]]:
+    """
+    Columnar parse_row over a block: locate each row's USD token, then convert the four
+    percentage tokens of every row in one array('d') pass. If a number in the block fails, the
+    block is converted row by row instead and only the failing rows fall back to parse_row, so
+    results and error texts match parse_row exactly.
+    Returns one dict or ValueError per input row, in order.
+    """
+    spans: List[Optional[int]] = []
+    flat: List[str] = []
+    for tokens in token_rows:
+        try:
+            usd_idx = locate_usd(tokens)
+        except ValueError:
+            usd_idx = None
+        spans.append(usd_idx)
+        if usd_idx is not None:
+            flat += tokens[usd_idx - 5:usd_idx - 1]
+    try:
+        pct = array("d", map(float, flat))
+    except ValueError:
+        pct, n = array("d"), 0
+        for j, usd_idx in enumerate(spans):
+            if usd_idx is None:
+                continue
+            try:
+                pct.extend([float(t) for t in flat[n:n + 4]])
+            except ValueError:
+                spans[j] = None            # parse_row reproduces the error text
+            n += 4
+
+    out: List[Union[dict, ValueError]] = []
+    k = 0
+    for tokens, usd_idx in zip(token_rows, spans):
+        if usd_idx is None:
+            try:
+                out.append(parse_row(tokens))
+            except ValueError as e:
+                out.append(e)
+            continue
+        usd_tok = tokens[usd_idx].strip()
+        try:
+            if not usd_tok.startswith("$"):
+                weekly_savings_usd = int(usd_tok)
+            elif usd_tok[1:].isdecimal():
+                weekly_savings_usd = int(usd_tok[1:])      # plain "$182400": no digit filtering needed
+            else:
+                weekly_savings_usd = coerce_int_from_currency(usd_tok)
+        except ValueError as e:
+            out.append(e)
+            k += 4
+            continue
+        tail_start = usd_idx - 5
+        out.append({
+            "svc": tokens[0].strip(),
+            "comparison": (tokens[1].strip() if tail_start == 2
+                           else " ".join([h.strip() for h in tokens[1:tail_start]]).strip()),
+            "tokens_saved_pct": pct[k],
+            "retry_drop_pct": pct[k + 1],
+            "latency_saved_pct": pct[k + 2],
+            "unit_cost_saved_pct": pct[k + 3],
+            "RSI_pool_env_delta": tokens[usd_idx - 1].strip(),
+            "weekly_savings_usd": weekly_savings_usd,
+        })
+        k += 4
+    return out
+
+# (line_no, reason, message, raw line) -> None
+RejectCallback = Callable[[int, str, str, str], None]
+
+def _warn_stderr(line_no: int, reason: str, message: str, raw: str) -> None:
+    print(f"[WARN] Skipping line due to parse error: {message}\n  LINE: {raw}", file=sys.stderr)
 
-    rows = []
-    for ln in raw_lines:
+def iter_rows(lines: Iterable[str], on_reject: RejectCallback = _warn_stderr, first_line: int = 1) -> Iterator[dict]:
+    """
+    Streaming stage: raw lines -> split_line -> parse_rows (blocks of PARSE_BLOCK) -> normalized dicts.
+    Lines are pulled one at a time, so memory stays bounded however long the input is.
+    Rejected lines go to on_reject(line_no, reason, message, raw) (a stderr [WARN] by default);
+    line numbers count from first_line.
+    """
+    pending: List[Tuple[int, str, List[str]]] = []
+
+    def flush():
+        for (no, ln, _), res in zip(pending, parse_rows([f for _, _, f in pending])):
+            if isinstance(res, dict):
+                yield res
+            else:
+                on_reject(no, getattr(res, "reason", "error"), str(res), ln.strip())
+        pending.clear()
+
+    for no, ln in enumerate(lines, first_line):
         # Skip empty and comment lines
         if not ln.strip() or ln.strip().startswith("#"):
             continue
@@ -196,20 +312,556 @@ def main():
                 if not looks_like_data:
                     continue
 
+        pending.append((no, ln, fields))
+        if len(pending) >= PARSE_BLOCK:
+            yield from flush()
+    yield from flush()
+
+def write_rows(rows: Iterable[dict], f: TextIO, flush_every: int = 1024) -> int:
+    """
+    Incremental DictWriter: writes each row as it arrives and flushes every `flush_every` rows,
+    so downstream readers see output while the input is still streaming (0 = never, e.g. for
+    compressed output where each flush costs ratio). Returns the row count.
+    """
+    writer = csv.DictWriter(f, fieldnames=HEADERS)
+    writer.writeheader()
+    n = 0
+    for r in rows:
+        writer.writerow(r)
+        n += 1
+        if flush_every and n % flush_every == 0:
+            f.flush()
+    return n
+
+# ---------- compressed I/O ----------
+IO_BLOCK = 1 << 20   # bytes per read/write on (de)compressed streams
+CODECS = {"gz": gzip, "bz2": bz2, "xz": lzma}
+_MAGIC = ((b"\x1f\x8b", "gz"), (b"BZh", "bz2"), (b"\xfd7zXZ\x00", "xz"))
+
+def sniff_codec(head: bytes) -> Optional[str]:
+    # codec name from leading magic bytes, None for plain text
+    for magic, name in _MAGIC:
+        if head.startswith(magic):
+            return name
+    return None
+
+class _Prefixed(io.RawIOBase):
+    """
+    Raw stream that replays `head` (bytes already read for sniffing) before the rest of `src`,
+    so a non-seekable stream can be sniffed without losing its first bytes.
+    """
+
+    def __init__(self, head: bytes, src: BinaryIO):
+        self.head, self.src = head, src
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        if self.head:
+            n = min(len(b), len(self.head))
+            b[:n], self.head = self.head[:n], self.head[n:]
+            return n
+        data = self.src.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+def open_input(src: Union[str, BinaryIO]) -> TextIO:
+    """
+    UTF-8 text lines from a path or a buffered binary stream (e.g. sys.stdin.buffer). gzip/bz2/xz input
+    is detected by magic bytes, not by name, and decompressed on the fly in IO_BLOCK reads (no temp files).
+    """
+    if isinstance(src, str):
+        with open(src, "rb") as f:
+            codec = sniff_codec(f.read(6))
+        if codec is None:
+            return open(src, "r", encoding="utf-8", buffering=IO_BLOCK)
+        return io.TextIOWrapper(io.BufferedReader(CODECS[codec].open(src, "rb"), IO_BLOCK), encoding="utf-8")
+    head = b""
+    while len(head) < 6:                           # a pipe may deliver fewer bytes per read
+        data = src.read(6 - len(head))
+        if not data:
+            break
+        head += data
+    src = io.BufferedReader(_Prefixed(head, src), IO_BLOCK)
+    codec = sniff_codec(head)
+    if codec is not None:
+        src = io.BufferedReader(CODECS[codec].open(src, "rb"), IO_BLOCK)
+    return io.TextIOWrapper(src, encoding="utf-8")
+
+def output_codec(path: Optional[str], compress: str) -> Optional[str]:
+    # --compress auto: by --out suffix (.gz/.bz2/.xz); otherwise the named codec ("none" = plain)
+    if compress == "auto":
+        return next((name for name in CODECS if path and path.endswith("." + name)), None)
+    return None if compress == "none" else compress
+
+def open_output(path: str, codec: Optional[str]) -> TextIO:
+    """
+    CSV text sink: a path or '-' (stdout), optionally compressed with `codec`.
+    Plain stdout is returned as sys.stdout and must not be closed by the caller.
+    """
+    if codec is None:
+        if path == "-":
+            return sys.stdout
+        return open(path, "w", newline="", encoding="utf-8", buffering=IO_BLOCK)
+    target = sys.stdout.buffer if path == "-" else path
+    level = {"compresslevel": 6} if codec == "gz" else {}   # gzip's default 9 costs ~3x CPU for ~1% size
+    return CODECS[codec].open(target, "wt", encoding="utf-8", newline="", **level)
+
+def expand_inputs(pattern: str) -> List[str]:
+    """
+    Batch inputs: a directory (its regular files) or a glob ('**' allowed), sorted by path.
+    """
+    if os.path.isdir(pattern):
+        paths = [os.path.join(pattern, name) for name in os.listdir(pattern)]
+    else:
+        paths = glob.glob(pattern, recursive=True)
+    paths = sorted(p for p in paths if os.path.isfile(p))
+    if not paths:
+        raise SystemExit(f"no input files match {pattern!r}")
+    return paths
+
+# ---------- columnar output ----------
+FLOAT_COLUMNS = ["tokens_saved_pct", "retry_drop_pct", "latency_saved_pct", "unit_cost_saved_pct"]
+INT_COLUMNS = ["weekly_savings_usd"]
+TEXT_COLUMNS = ["svc", "comparison", "RSI_pool_env_delta"]   # RSI_pool_env_delta is free text in the source
+FORMATS = ("csv", "parquet", "npz")
+ROW_GROUP = 65536   # rows per Parquet row group
+
+def output_format(path: Optional[str], fmt: str) -> str:
+    # --format auto: .parquet/.pq -> parquet, .npz -> npz, anything else (or --out-dir) -> csv
+    if fmt != "auto":
+        return fmt
+    if path and path.endswith((".parquet", ".pq")):
+        return "parquet"
+    return "npz" if path and path.endswith(".npz") else "csv"
+
+class ColumnarWriter:
+    """
+    Typed columns for the HEADERS schema: float64 percentages, int64 weekly_savings_usd and text for
+    svc / comparison / RSI_pool_env_delta. fmt "parquet" needs pyarrow and streams one row group per
+    `row_group` rows; fmt "npz" needs only numpy and keeps the compact typed buffers until close(),
+    since an .npz cannot be appended to. Both libraries are imported only when used.
+    """
+
+    def __init__(self, path: str, fmt: str, row_group: int = ROW_GROUP):
+        if fmt not in ("parquet", "npz"):
+            raise ValueError(f"columnar fmt must be 'parquet' or 'npz', got {fmt!r}")
+        self.path, self.fmt, self.row_group = path, fmt, max(1, row_group)
+        self.rows = 0
+        self._pq = None
+        self._reset()
         try:
-            row = parse_row(fields)
-            rows.append(row)
-        except Exception as e:
-            print(f"[WARN] Skipping line due to parse error: {e}\n  LINE: {ln.strip()}", file=sys.stderr)
-
-    # Write CSV
-    with open(args.outfile, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=HEADERS)
-        writer.writeheader()
+            if fmt == "parquet":
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                self._pa = pa
+                self._schema = pa.schema([(k, pa.float64() if k in FLOAT_COLUMNS else
+                                           pa.int64() if k in INT_COLUMNS else pa.string()) for k in HEADERS])
+                self._pq = pq.ParquetWriter(path, self._schema)
+            else:
+                import numpy
+                self._np = numpy
+        except ImportError as e:
+            raise SystemExit(f"--format {fmt} needs {e.name} installed (csv and npz need no pyarrow)")
+
+    def _reset(self) -> None:
+        self._cols = {k: array("d") if k in FLOAT_COLUMNS else array("q") if k in INT_COLUMNS else []
+                      for k in HEADERS}
+
+    def writerows(self, rows: Iterable[dict]) -> None:
+        cols = [(k, self._cols[k].append) for k in HEADERS]
+        n = 0
         for r in rows:
-            writer.writerow(r)
+            for k, append in cols:
+                append(r[k])
+            n += 1
+            if self._pq is not None and len(self._cols["svc"]) >= self.row_group:
+                self._flush_group()
+                cols = [(k, self._cols[k].append) for k in HEADERS]
+        self.rows += n
+
+    def _flush_group(self) -> None:
+        pa, n = self._pa, len(self._cols["svc"])
+        if n:
+            arrays = [pa.Array.from_buffers(self._schema.field(k).type, n, [None, pa.py_buffer(v)])
+                      if isinstance(v, array) else pa.array(v, type=pa.string())
+                      for k, v in self._cols.items()]
+            self._pq.write_table(pa.Table.from_arrays(arrays, schema=self._schema))
+        self._reset()
+
+    def close(self) -> None:
+        if self._pq is not None:
+            self._flush_group()
+            self._pq.close()
+            self._pq = None
+        elif self.fmt == "npz" and self._cols is not None:
+            np = self._np
+            data = {k: np.frombuffer(v, dtype=np.float64 if k in FLOAT_COLUMNS else np.int64)
+                    if isinstance(v, array) else np.array(v, dtype=str) for k, v in self._cols.items()}
+            with open(self.path, "wb") as f:   # file object: np.savez would append ".npz" to a bare name
+                np.savez(f, **data)
+            self._cols = None
+
+    def __enter__(self) -> "ColumnarWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+def write_columnar(rows: Iterable[dict], path: str, fmt: str) -> int:
+    # Columnar counterpart of write_rows; returns the row count
+    with ColumnarWriter(path, fmt) as w:
+        w.writerows(rows)
+    return w.rows
+
+def iter_chunks(paths: List[str], chunk_lines: int) -> Iterator[Tuple[int, int, List[str]]]:
+    """
+    (file index, first line number, lines) chunks in file-then-line order; every file yields at least one chunk.
+    None entries are skipped (their index is kept, see run_batch carry).
+    """
+    for i, path in enumerate(paths):
+        if path is None:
+            continue
+        with open_input(path) as f:
+            chunk: List[str] = []
+            first, sent = 1, False
+            for ln in f:
+                chunk.append(ln)
+                if len(chunk) >= chunk_lines:
+                    yield i, first, chunk
+                    first, chunk, sent = first + len(chunk), [], True
+            if chunk or not sent:
+                yield i, first, chunk
+
+def parse_chunk(lines: List[str], first_line: int = 1) -> Tuple[List[dict], List[Tuple[int, str, str, str]]]:
+    """
+    Worker: parse one chunk of lines; rejects come back to the parent so they are recorded in input order.
+    """
+    rejects: List[Tuple[int, str, str, str]] = []
+    rows = list(iter_rows(lines, on_reject=lambda *r: rejects.append(r), first_line=first_line))
+    return rows, rejects
+
+def convert_chunks(chunks: Iterable[Tuple[int, int, List[str]]], workers: int) -> Iterator[Tuple[int, List[dict], list]]:
+    """
+    Parse chunks across a process pool; results come back in chunk order (stable file-then-line output)
+    with at most 2*workers chunks in flight.
+    """
+    if workers <= 1:
+        for i, first, lines in chunks:
+            yield (i,) + parse_chunk(lines, first)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        pending = deque()
+        try:
+            for i, first, lines in chunks:
+                pending.append((i, ex.submit(parse_chunk, lines, first)))
+                if len(pending) >= 2 * workers:
+                    i0, fut = pending.popleft()
+                    yield (i0,) + fut.result()
+            while pending:
+                i0, fut = pending.popleft()
+                yield (i0,) + fut.result()
+        finally:
+            # consumer stopped early (e.g. --max-errors): drop queued work instead of finishing it
+            for _, fut in pending:
+                fut.cancel()
+
+def output_names(paths: List[str], out_dir: str, codec: Optional[str] = None, fmt: str = "csv") -> List[str]:
+    """
+    One output per input: <out_dir>/<input stem>.csv[.gz|.bz2|.xz] (or .parquet / .npz); a compression
+    suffix on the input is dropped before taking the stem. Clashing stems are an error.
+    """
+    def stem(p: str) -> str:
+        name = os.path.basename(p)
+        for ext in CODECS:
+            if name.endswith("." + ext):
+                name = name[:-len(ext) - 1]
+                break
+        return os.path.splitext(name)[0]
+
+    suffix = "." + fmt + ("." + codec if codec and fmt == "csv" else "")
+    outs = [os.path.join(out_dir, stem(p) + suffix) for p in paths]
+    if len(set(outs)) != len(outs):
+        raise SystemExit("inputs with the same file stem would overwrite each other in --out-dir")
+    return outs
+
+def _open_table(path: str, fmt: str, codec: Optional[str]):
+    # (closeable, writer with .writerows) for one batch output
+    if fmt != "csv":
+        w = ColumnarWriter(path, fmt)
+        return w, w
+    f = open_output(path, codec)
+    writer = csv.DictWriter(f, fieldnames=HEADERS)
+    writer.writeheader()
+    return f, writer
+
+def run_batch(paths: List[str], outfile: Optional[str], out_dir: Optional[str],
+              workers: int, chunk_lines: int, sink: "RejectSink", codec: Optional[str] = None,
+              fmt: str = "csv", carry: Optional[Dict[int, Iterable[List[str]]]] = None) -> List[int]:
+    """
+    Batch conversion: one merged table (outfile) or one per input (out_dir) in `fmt` (FORMATS);
+    CSV is compressed with `codec` if given. Rejects go to `sink`; returns rows written per input file.
+    carry (merged CSV only): {input index: already-normalized CSV rows} written in that file's place
+    instead of re-parsing it (incremental mode).
+    """
+    written = [0] * len(paths)
+    carry = dict(carry or {})
+    chunks = iter_chunks([p if i not in carry else None for i, p in enumerate(paths)], chunk_lines)
+
+    def emit_carried(upto: int) -> None:
+        for j in sorted(j for j in carry if j < upto):
+            rows = carry.pop(j)
+            for r in rows:
+                raw_writer.writerow(r)
+                written[j] += 1
+
+    with ExitStack() as stack:
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+            outs = output_names(paths, out_dir, codec, fmt)
+            current, f, writer = -1, None, None
+        else:
+            f, writer = _open_table(outfile, fmt, codec)
+            stack.enter_context(f)
+            if carry:
+                raw_writer = csv.writer(f)
+        for i, rows, rejects in convert_chunks(chunks, workers):
+            emit_carried(i)
+            for rej in rejects:
+                sink.reject(paths[i], *rej)
+            if out_dir and i != current:
+                if f is not None:
+                    f.close()
+                (f, writer), current = _open_table(outs[i], fmt, codec), i
+            writer.writerows(rows)
+            written[i] += len(rows)
+        emit_carried(len(paths))
+        if out_dir and f is not None:
+            f.close()
+    return written
+
+# ---------- incremental mode ----------
+INDEX_VERSION = 1
+
+def file_sha256(path: str) -> str:
+    # SHA-256 of the file as stored (compressed bytes for .gz/.bz2/.xz), read in IO_BLOCK blocks
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(IO_BLOCK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def default_index(outfile: Optional[str], out_dir: Optional[str]) -> str:
+    return outfile + ".n4index.json" if outfile else os.path.join(out_dir, ".n4index.json")
+
+def load_index(path: str) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except FileNotFoundError:
+        return {}
+    return index if index.get("version") == INDEX_VERSION else {}
+
+def save_index(path: str, index: dict) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, sort_keys=True, separators=(",", ":"))
+    os.replace(tmp, path)   # atomic: a crash never leaves a half-written index
+
+def _carried_rows(reader: Iterator[List[str]], state: List[int], start: int, end: int) -> Iterator[List[str]]:
+    # data rows [start, end) of the previous merged CSV; ranges are consumed in increasing order
+    while state[0] < start:
+        next(reader)
+        state[0] += 1
+    while state[0] < end:
+        yield next(reader)
+        state[0] += 1
+
+def run_incremental(paths: List[str], outfile: Optional[str], out_dir: Optional[str], workers: int,
+                    chunk_lines: int, sink: "RejectSink", codec: Optional[str], fmt: str,
+                    index_path: str) -> Tuple[List[int], List[bool]]:
+    """
+    Re-parse only inputs whose SHA-256 changed since the last run recorded in index_path.
+    out_dir: unchanged inputs keep their existing output file; outputs recorded for inputs that are
+    no longer listed are deleted. Merged CSV: the output is rebuilt in
+    input order, copying each unchanged input's recorded row range [start, end) from the previous
+    output instead of parsing it, then swapped in atomically. The index (per input: sha256, output,
+    row range, rejects by reason) is only rewritten after the output is complete.
+    Returns (rows per input, unchanged flag per input).
+    """
+    settings = {"out": outfile or os.path.abspath(out_dir), "format": fmt, "codec": codec}
+    old = load_index(index_path)
+    prev = old.get("files", {}) if old.get("settings") == settings else {}
+    hashes = [file_sha256(p) for p in paths]
+    if out_dir:
+        outs = output_names(paths, out_dir, codec, fmt)
+        same = [prev.get(p, {}).get("sha256") == h and os.path.exists(o) for p, h, o in zip(paths, hashes, outs)]
+    else:
+        outs = [outfile] * len(paths)
+        ok = os.path.exists(outfile) and os.path.getsize(outfile) == old.get("out_size")
+        same = [ok and prev.get(p, {}).get("sha256") == h for p, h in zip(paths, hashes)]
+
+    todo = [i for i, s in enumerate(same) if not s]
+    written = [0] * len(paths)
+    if out_dir:
+        for i, n in zip(todo, run_batch([paths[i] for i in todo], None, out_dir, workers, chunk_lines,
+                                        sink, codec, fmt)):
+            written[i] = n
+        for p in set(prev) - set(paths):        # removed inputs: drop their stale outputs
+            o = prev[p].get("output")
+            if o and o not in outs and os.path.exists(o):
+                os.remove(o)
+    elif todo or set(prev) != set(paths):   # changed, new or removed inputs: rebuild the merged file
+        tmp = outfile + ".tmp"
+        with ExitStack() as stack:
+            carry = {}
+            if any(same):
+                reader = csv.reader(stack.enter_context(open_input(outfile)))
+                next(reader)   # header
+                state = [0]
+                for i in (i for i, s in enumerate(same) if s):
+                    start, end = prev[paths[i]]["rows"]
+                    carry[i] = _carried_rows(reader, state, start, end)
+            written = run_batch(paths, tmp, None, workers, chunk_lines, sink, codec, fmt, carry)
+        os.replace(tmp, outfile)
+    for i, s in enumerate(same):
+        if s:
+            start, end = prev[paths[i]]["rows"]
+            written[i] = end - start
+
+    files, pos = {}, 0
+    for i, p in enumerate(paths):
+        start = 0 if out_dir else pos
+        files[p] = {"sha256": hashes[i], "output": outs[i], "rows": [start, start + written[i]],
+                    "rejected": prev[p]["rejected"] if same[i] else sink.by_file.get(p, {})}
+        pos += written[i]
+    index = {"version": INDEX_VERSION, "settings": settings, "files": files}
+    if not out_dir:
+        index["out_size"] = os.path.getsize(outfile)
+    save_index(index_path, index)
+    return written, same
+
+REJECT_FIELDS = ["file", "line", "reason", "message", "raw"]
+
+class RejectSink:
+    """
+    Rejected-row sink: per-reason counters (overall and per file), an optional side file
+    (*.jsonl -> JSON lines, anything else -> CSV with REJECT_FIELDS) and a fail-fast limit.
+    Only the first `echo` rejects are echoed to stderr; the side file gets all of them.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_errors: Optional[int] = None, echo: int = 20):
+        self.path, self.max_errors, self.echo = path, max_errors, echo
+        self.total = 0
+        self.counts: Dict[str, int] = {}
+        self.by_file: Dict[str, Dict[str, int]] = {}
+        self._f = self._csv = None
+        if path:
+            self._f = open(path, "w", newline="", encoding="utf-8")
+            if not path.endswith(".jsonl"):
+                self._csv = csv.writer(self._f)
+                self._csv.writerow(REJECT_FIELDS)
+
+    def reject(self, file: str, line_no: int, reason: str, message: str, raw: str) -> None:
+        self.total += 1
+        self.counts[reason] = self.counts.get(reason, 0) + 1
+        per_file = self.by_file.setdefault(file, {})
+        per_file[reason] = per_file.get(reason, 0) + 1
+        if self._csv is not None:
+            self._csv.writerow([file, line_no, reason, message, raw])
+        elif self._f is not None:
+            self._f.write(json.dumps(dict(zip(REJECT_FIELDS, (file, line_no, reason, message, raw)))) + "\n")
+        if self.total <= self.echo:
+            print(f"[WARN] Skipping line due to parse error: {message}\n  LINE: {raw}\n  AT: {file}:{line_no}",
+                  file=sys.stderr)
+        if self.max_errors is not None and self.total > self.max_errors:
+            raise SystemExit(f"[ERROR] more than --max-errors={self.max_errors} rejected lines (last at {file}:{line_no})")
+
+    def summary(self, file: Optional[str] = None) -> str:
+        counts = self.counts if file is None else self.by_file.get(file, {})
+        n = sum(counts.values())
+        return f"rejected={n}" + (" (" + ", ".join(f"{k}={v}" for k, v in sorted(counts.items())) + ")" if n else "")
+
+    def close(self) -> None:
+        if self.total > self.echo:
+            more = f"; all {self.total} in {self.path}" if self.path else "; use --rejects to keep them"
+            print(f"[WARN] {self.total - self.echo} more rejected lines not shown{more}", file=sys.stderr)
+        if self._f is not None:
+            self._f.close()
+            self._f = self._csv = None
+
+def main():
+    ap = argparse.ArgumentParser(description="Normalize N4 vendor sheet to CSV (or Parquet / NumPy .npz).")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--in", dest="infile", help="Path to input TXT/CSV/TSV")
+    src.add_argument("--stdin", action="store_true", help="Read from STDIN")
+    src.add_argument("--glob", dest="pattern", help="Batch mode: glob of N4 sheets or a directory")
+    dst = ap.add_mutually_exclusive_group(required=True)
+    dst.add_argument("--out", dest="outfile", help="Path to output CSV ('-' for STDOUT)")
+    dst.add_argument("--out-dir", help="Batch mode: write one CSV per input into this directory")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Batch mode: parser processes")
+    ap.add_argument("--chunk-lines", type=int, default=20000, help="Batch mode: lines per work item")
+    ap.add_argument("--rejects", help="Write rejected lines (file, line, reason, message, raw) to this .csv/.jsonl")
+    ap.add_argument("--max-errors", type=int, default=None, help="Stop with an error after this many rejected lines")
+    ap.add_argument("--warn-limit", type=int, default=20, help="Rejected lines echoed to stderr (default 20)")
+    ap.add_argument("--compress", choices=["auto", "none"] + list(CODECS), default="auto",
+                    help="Output compression; auto = by --out suffix (.gz/.bz2/.xz). Input is detected by magic bytes")
+    ap.add_argument("--format", dest="fmt", choices=("auto",) + FORMATS, default="auto",
+                    help="Output format; auto = by --out suffix (.parquet/.pq, .npz, else csv). parquet needs pyarrow")
+    ap.add_argument("--incremental", action="store_true",
+                    help="Batch mode: re-parse only inputs whose SHA-256 changed since the last run")
+    ap.add_argument("--index", help="Incremental index file (default <out>.n4index.json or <out-dir>/.n4index.json)")
+    args = ap.parse_args()
+
+    fmt = output_format(args.outfile, args.fmt)
+    codec = output_codec(args.outfile, args.compress)
+    if fmt != "csv" and (codec or args.outfile == "-"):
+        ap.error(f"--format {fmt} writes a file: no '-' output and no --compress")
+
+    sink = RejectSink(args.rejects, args.max_errors, max(0, args.warn_limit))
+    if args.pattern:
+        if args.outfile == "-":
+            ap.error("batch mode needs a file for --out")
+        if args.incremental and args.outfile and fmt != "csv":
+            ap.error("--incremental with a merged --out needs csv; use --out-dir for parquet/npz")
+        paths = expand_inputs(args.pattern)
+        same = [False] * len(paths)
+        try:
+            if args.incremental:
+                if args.out_dir:
+                    os.makedirs(args.out_dir, exist_ok=True)
+                written, same = run_incremental(paths, args.outfile, args.out_dir, max(1, args.workers),
+                                                max(1, args.chunk_lines), sink, codec, fmt,
+                                                args.index or default_index(args.outfile, args.out_dir))
+            else:
+                written = run_batch(paths, args.outfile, args.out_dir, max(1, args.workers),
+                                    max(1, args.chunk_lines), sink, codec, fmt)
+        finally:
+            sink.close()
+        print(f"Wrote {sum(written)} rows from {len(paths)} files ({sum(same)} unchanged) -> "
+              f"{args.outfile or args.out_dir}; {sink.summary()}")
+        for path, n, s in zip(paths, written, same):
+            print(f"  {path}: rows={n} " + ("unchanged" if s else sink.summary(path)))
+        return
+    if args.out_dir or args.incremental:
+        ap.error("--out-dir and --incremental require --glob")
+
+    # Stream: line iterator -> parse -> incremental CSV writer (constant memory) or typed columns
+    name = args.infile or "<stdin>"
+    with ExitStack() as stack:
+        stack.callback(sink.close)
+        lines = stack.enter_context(open_input(args.infile)) if args.infile else open_input(sys.stdin.buffer)
+        rows = iter_rows(lines, on_reject=lambda *r: sink.reject(name, *r))
+        if fmt != "csv":
+            n = write_columnar(rows, args.outfile, fmt)
+        else:
+            out = open_output(args.outfile, codec)
+            if out is not sys.stdout:
+                stack.enter_context(out)
+            n = write_rows(rows, out, flush_every=0 if codec else 1024)
 
-    print(f"Wrote {len(rows)} rows -> {args.outfile}")
+    print(f"Wrote {n} rows -> {args.outfile}; {sink.summary()}", file=sys.stderr if args.outfile == "-" else sys.stdout)
 
 if __name__ == "__main__":
     main()